@@ -19,11 +19,13 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import configuration and database
 from config import Config
-from database import DB, User, Report, bcrypt
+from database import DB, User, Report, bcrypt, HISTORY_PAGE_SIZE
+from jobs import JobQueue, QueueFull
+import metrics
 
 # Import the analyse function from your core_detector script
 try:
-    from core_detector import analyse
+    from core_detector import analyse, result_cache_stats, create_cohort, delete_cohort, get_cohort, cohort_report
     print("Successfully imported analyse function from core_detector.py.")
 except ImportError as e:
     print(f"Error importing analyse function: {e}")
@@ -60,6 +62,11 @@ def unauthorized():
 
 DB.initialize()
 
+def save_job_report(job, result):
+    Report.save_report_metadata(job['user_id'], job['file_name'], result['originality'], result['aiProbability'], result['pdfReportPath'])
+
+job_queue = JobQueue(on_complete=save_job_report)
+
 # --- Auth Blueprint Routes ---
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -156,8 +163,7 @@ def me():
 @login_required
 def dashboard_stats():
     user_id = current_user.id
-    total_reports = Report.get_total_reports_count(user_id)
-    last_report = Report.get_last_report(user_id)
+    total_reports, last_report = Report.get_user_stats(user_id)
     if last_report and 'pdf_report_path' in last_report:
         last_report['pdf_file_name'] = os.path.basename(last_report['pdf_report_path'])
         del last_report['pdf_report_path']
@@ -168,12 +174,16 @@ def dashboard_stats():
 @login_required
 def get_history():
     user_id = current_user.id
-    reports = Report.get_user_reports(user_id)
+    try:
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+        reports, next_cursor = Report.get_user_reports(user_id, limit=limit, cursor=request.args.get('cursor'))
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
     for report in reports:
         if 'pdf_report_path' in report:
             report['pdf_file_name'] = os.path.basename(report['pdf_report_path'])
             del report['pdf_report_path']
-    return jsonify(reports), 200
+    return jsonify({"reports": reports, "next_cursor": next_cursor}), 200
 
 def save_uploaded_file(file_obj):
     if not file_obj: return None
@@ -193,6 +203,10 @@ def save_uploaded_file(file_obj):
         print(f"Error saving file: {e}")
         raise
 
+def remove_temp_files(*paths):
+    for path in paths:
+        if path and os.path.exists(path): os.unlink(path)
+
 @app.route('/analyse', methods=['POST'])
 @login_required
 def run_analysis():
@@ -208,17 +222,108 @@ def run_analysis():
         if comparison_file_obj: comparison_temp_file_path = save_uploaded_file(comparison_file_obj)
         main_file_arg = {'name': main_temp_file_path} if main_temp_file_path else None
         comparison_file_arg = {'name': comparison_temp_file_path} if comparison_temp_file_path else None
-        cite_txt, originality_score, ai_probability, pdf_report_path = analyse(main_txt=main_text_input, main_file=main_file_arg, comparison_txt=comparison_text_input, comparison_file=comparison_file_arg)
         file_name_for_history = main_file_obj.filename if main_file_obj else "Text Input"
-        Report.save_report_metadata(current_user.id, file_name_for_history, originality_score, ai_probability, pdf_report_path)
-        response_data = { "citations": cite_txt.split('\n') if cite_txt != "No overlaps." else ["No overlaps."], "originality": originality_score, "aiProbability": ai_probability, "pdfReportPath": pdf_report_path }
-        return jsonify(response_data)
+        job_id = job_queue.submit(
+            current_user.id, file_name_for_history,
+            dict(main_txt=main_text_input, main_file=main_file_arg, comparison_txt=comparison_text_input, comparison_file=comparison_file_arg),
+            cleanup_paths=[main_temp_file_path, comparison_temp_file_path])
+        return jsonify({"jobId": job_id, "status": "queued", "statusUrl": url_for('job_status', job_id=job_id)}), 202
+    except QueueFull as e:
+        remove_temp_files(main_temp_file_path, comparison_temp_file_path)
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
     except Exception as e:
         print(f"Analysis error: {e}")
+        remove_temp_files(main_temp_file_path, comparison_temp_file_path)
         return jsonify({"error": f"An error occurred during analysis: {str(e)}"}), 500
-    finally:
-        if main_temp_file_path and os.path.exists(main_temp_file_path): os.unlink(main_temp_file_path)
-        if comparison_temp_file_path and os.path.exists(comparison_temp_file_path): os.unlink(comparison_temp_file_path)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if not job or job['user_id'] != current_user.id:
+        return jsonify({"error": "Job not found"}), 404
+    response_data = {key: job[key] for key in ('status', 'stage', 'stages', 'progress', 'result', 'error')}
+    response_data['jobId'] = job['id']
+    return jsonify(response_data), 200
+
+COHORT_MAX_DOCUMENTS = int(os.getenv("COHORT_MAX_DOCUMENTS", "500"))
+
+def queue_cohort_documents(cohort_name, cohort_id=None):
+    """Queues the uploaded `documents` files and `texts` fields for a cohort
+    check, creating the cohort first when no cohort_id is given; a cohort
+    created here is removed again if the job is not accepted."""
+    files = [f for f in request.files.getlist('documents') if f and f.filename]
+    texts = [t for t in request.form.getlist('texts') if t.strip()]
+    if not (files or texts):
+        return jsonify({"error": "No documents provided"}), 400
+    if len(files) + len(texts) > COHORT_MAX_DOCUMENTS:
+        return jsonify({"error": f"At most {COHORT_MAX_DOCUMENTS} documents per request"}), 400
+    temp_paths = []
+    created = None
+    try:
+        if not cohort_id:
+            cohort_id = created = create_cohort(current_user.id, cohort_name)
+        documents = []
+        for file_obj in files:
+            temp_paths.append(save_uploaded_file(file_obj))
+            documents.append({"name": file_obj.filename, "file": temp_paths[-1]})
+        documents += [{"name": f"Text {i}", "text": t} for i, t in enumerate(texts, 1)]
+        job_id = job_queue.submit(current_user.id, cohort_name, dict(cohort_id=cohort_id, documents=documents),
+                                  cleanup_paths=temp_paths, kind="cohort")
+        return jsonify({"cohortId": cohort_id, "jobId": job_id, "status": "queued",
+                        "statusUrl": url_for('job_status', job_id=job_id)}), 202
+    except QueueFull as e:
+        remove_temp_files(*temp_paths)
+        discard_cohort(created)
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    except Exception as e:
+        print(f"Cohort error: {e}")
+        remove_temp_files(*temp_paths)
+        discard_cohort(created)
+        return jsonify({"error": f"An error occurred during analysis: {str(e)}"}), 500
+
+def discard_cohort(cohort_id):
+    if cohort_id:
+        try:
+            delete_cohort(cohort_id)
+        except Exception as e:
+            print(f"Error removing cohort {cohort_id}: {e}")
+
+def owned_cohort(cohort_id):
+    cohort = get_cohort(cohort_id)
+    return cohort if cohort and cohort['owner'] == current_user.id else None
+
+@app.route('/api/cohorts', methods=['POST'])
+@login_required
+def new_cohort():
+    name = request.form.get('name') or "Untitled cohort"
+    return queue_cohort_documents(name)
+
+@app.route('/api/cohorts/<cohort_id>/documents', methods=['POST'])
+@login_required
+def add_cohort_documents(cohort_id):
+    cohort = owned_cohort(cohort_id)
+    if not cohort:
+        return jsonify({"error": "Cohort not found"}), 404
+    return queue_cohort_documents(cohort['name'], cohort_id)
+
+@app.route('/api/cohorts/<cohort_id>', methods=['GET'])
+@login_required
+def view_cohort(cohort_id):
+    if not owned_cohort(cohort_id):
+        return jsonify({"error": "Cohort not found"}), 404
+    return jsonify(cohort_report(cohort_id)), 200
+
+@app.route('/api/cache_stats', methods=['GET'])
+@login_required
+def cache_stats():
+    return jsonify(result_cache_stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    gauges = {"jobs_in_progress": job_queue.pending}
+    gauges.update({f"result_cache_{k}": v for k, v in result_cache_stats().items()})
+    return app.response_class(metrics.registry.render(gauges), mimetype='text/plain; version=0.0.4')
 
 @app.route('/download-report/<path:filename>', methods=['GET'])
 @login_required
@@ -0,0 +1,193 @@
+# backend/api_clients.py
+"""
+Shared, rate-limited access to the external APIs (Gemini and Serper).
+
+Every call goes through a RateLimitedAPI: a token bucket sets the request
+rate, a slot count caps concurrent requests, and 429/5xx responses or
+connection errors are retried with exponential backoff. Limits come from
+the environment, e.g. GEMINI_RPS, GEMINI_BURST, GEMINI_CONCURRENCY,
+GEMINI_RETRIES. Bucket and slots live in a small SQLite file
+(LIMITER_DB_PATH), so all job workers on the host share one budget.
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+import requests
+
+import metrics
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SharedLimits:
+    """Token buckets and concurrency slots shared by every process that
+    opens the same file."""
+
+    def __init__(self, path: str, slot_lease: float = 600.0, poll: float = 0.05):
+        self.path = path
+        self.slot_lease = slot_lease  # a slot older than this is assumed abandoned
+        self.poll = poll
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                         " name TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS slots ("
+                         " id TEXT PRIMARY KEY, name TEXT NOT NULL, pid INTEGER, taken_at REAL NOT NULL)")
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        # Opened per operation and closed right away.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def reserve(self, name: str, rate: float, capacity: float) -> float:
+        """Takes a token and returns how long to wait before using it. The
+        balance may go negative: callers queue up behind one another instead
+        of all polling for the next free token."""
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT tokens, stamp FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, stamp) VALUES (?, ?, ?)",
+                         (name, tokens, now))
+        return max(0.0, -tokens / rate)
+
+    def acquire_token(self, name: str, rate: float, capacity: float):
+        wait = self.reserve(name, rate, capacity)
+        if wait:
+            time.sleep(wait)
+
+    def _try_slot(self, name: str, limit: int) -> Optional[str]:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM slots WHERE name = ? AND taken_at < ?", (name, now - self.slot_lease))
+            rows = conn.execute("SELECT id, pid FROM slots WHERE name = ?", (name,)).fetchall()
+            if len(rows) >= limit and os.name == "posix":
+                # Free the slots of processes that died mid-call.
+                dead = [slot_id for slot_id, pid in rows if not _alive(pid)]
+                conn.executemany("DELETE FROM slots WHERE id = ?", [(d,) for d in dead])
+                rows = [r for r in rows if r[0] not in dead]
+            if len(rows) >= limit:
+                return None
+            slot_id = uuid.uuid4().hex
+            conn.execute("INSERT INTO slots (id, name, pid, taken_at) VALUES (?, ?, ?, ?)",
+                         (slot_id, name, os.getpid(), now))
+        return slot_id
+
+    @contextmanager
+    def slot(self, name: str, limit: int) -> Iterator[None]:
+        """Holds one of `limit` concurrent slots for `name`."""
+        while True:
+            slot_id = self._try_slot(name, limit)
+            if slot_id:
+                break
+            time.sleep(self.poll)
+        try:
+            yield
+        finally:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM slots WHERE id = ?", (slot_id,))
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+LIMITER_DB_PATH = os.getenv("LIMITER_DB_PATH", os.path.join(tempfile.gettempdir(), "plagiarism_limits.sqlite3"))
+_limits = SharedLimits(LIMITER_DB_PATH)
+
+
+def _status_of(exc: Exception) -> Optional[int]:
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code
+    code = getattr(exc, "code", None)  # google.api_core exceptions carry the HTTP status
+    return code if isinstance(code, int) else None
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return _status_of(exc) in RETRYABLE_STATUS
+
+
+class RateLimitedAPI:
+    def __init__(self, name: str, rate: float, burst: float, concurrency: int,
+                 retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 limits: SharedLimits = _limits):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.limits = limits
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.retried = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name: str, rate: float, burst: float, concurrency: int) -> "RateLimitedAPI":
+        prefix = name.upper()
+        return cls(name,
+                   rate=float(os.getenv(f"{prefix}_RPS", rate)),
+                   burst=float(os.getenv(f"{prefix}_BURST", burst)),
+                   concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+                   retries=int(os.getenv(f"{prefix}_RETRIES", 4)))
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs fn(*args, **kwargs) within the rate and concurrency limits."""
+        for attempt in range(self.retries + 1):
+            self.limits.acquire_token(self.name, self.rate, self.burst)
+            with self._lock:
+                self.calls += 1
+            metrics.incr(f"api_calls_{self.name}")
+            try:
+                with self.limits.slot(self.name, self.concurrency):
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                with self._lock:
+                    self.retried += 1
+                metrics.incr(f"api_retries_{self.name}")
+                time.sleep(delay)
+
+
+gemini = RateLimitedAPI.from_env("gemini", rate=1.0, burst=2, concurrency=2)
+gemini_embed = RateLimitedAPI.from_env("gemini_embed", rate=2.0, burst=4, concurrency=2)
+serper = RateLimitedAPI.from_env("serper", rate=5.0, burst=10, concurrency=4)
@@ -0,0 +1,91 @@
+# backend/benchmarks/bench_limits.py
+"""
+Aggregate Serper request rate with several job worker processes against the
+local fake service, which answers 429 above its own rate limit. The client
+limit is set to the same rate; since the bucket and the concurrency slots are
+shared through LIMITER_DB_PATH, the combined rate should stay at that limit
+whatever the number of workers.
+
+    python benchmarks/bench_limits.py [--workers 1,2,4] [--rps 5] [--calls 20]
+
+The rate counts every request sent, including the ones the service rejected
+with a 429; the run exits with status 1 when it is more than --tolerance x
+the configured limit for any worker count.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def worker(calls):
+    import requests
+    from api_clients import serper
+
+    session = requests.Session()
+
+    def post():
+        response = session.post(os.environ["SERPER_URL"], json={"q": "limits", "num": 10}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    for _ in range(calls):
+        serper.call(post)
+    return serper.retried
+
+
+def run(workers, calls, svc):
+    svc.counts.clear()
+    with ProcessPoolExecutor(workers) as pool:
+        t0 = time.perf_counter()
+        retried = sum(pool.map(worker, [calls] * workers))
+        elapsed = time.perf_counter() - t0
+    sent = workers * calls + svc.counts.get("serper_429", 0)
+    return {"requests": sent, "seconds": elapsed, "rate": sent / elapsed,
+            "rejected": svc.counts.get("serper_429", 0), "retried": retried}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated worker process counts")
+    ap.add_argument("--rps", type=float, default=5.0, help="rate limit of both the client and the fake service")
+    ap.add_argument("--calls", type=int, default=20, help="requests per worker")
+    ap.add_argument("--latency", type=float, default=0.05, help="seconds added to each search call")
+    ap.add_argument("--tolerance", type=float, default=1.2, help="allowed excess over the limit")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-limits-")
+    # Workers read these at import time; the burst equals the rate on both sides.
+    os.environ.update({"SERPER_RPS": str(args.rps), "SERPER_BURST": str(args.rps), "SERPER_CONCURRENCY": "4",
+                       "LIMITER_DB_PATH": os.path.join(workdir, "limits.sqlite3"), "DEBUG": "false"})
+    from fake_services import FakeServices
+
+    svc = FakeServices(latency=args.latency, serper_rps=args.rps).start()
+    os.environ.update(svc.env())
+    results = {}
+    try:
+        for n in [int(w) for w in args.workers.split(",") if w]:
+            results[n] = run(n, args.calls, svc)
+    finally:
+        svc.stop()
+
+    print(f"{'workers':<9}{'requests':>9}{'seconds':>9}{'req/s':>8}{'429s':>6}{'retried':>9}")
+    for n, r in results.items():
+        print(f"{n:<9}{r['requests']:>9}{r['seconds']:>9.2f}{r['rate']:>8.2f}{r['rejected']:>6}{r['retried']:>9}")
+    # The first `burst` (= rps) requests go out at once: n requests take at
+    # least (n - burst) / rps seconds.
+    over = [n for n, r in results.items()
+            if r["rate"] > args.tolerance * args.rps * r["requests"] / max(1.0, r["requests"] - args.rps)]
+    if over:
+        print(f"\nWorker counts above {args.rps:g} req/s: {', '.join(map(str, over))}")
+        sys.exit(1)
+    print(f"\nAll runs within {args.rps:g} req/s (tolerance x{args.tolerance:.2f}).")
+
+
+if __name__ == "__main__":
+    main()
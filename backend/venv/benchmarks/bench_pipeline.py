@@ -0,0 +1,170 @@
+# backend/benchmarks/bench_pipeline.py
+"""
+End-to-end benchmark for core_detector.analyse() against the local fake
+Gemini/Serper services (fake_services.py), so it runs offline and gives the
+same numbers from one run to the next. Search hits point at the pages in
+benchmarks/fixtures; the documents reuse some of their sentences, so the
+plagiarism stage has real overlaps to find.
+
+    python benchmarks/bench_pipeline.py [--sizes small,medium,large] [--repeat 3]
+    python benchmarks/bench_pipeline.py --save-baseline baseline.json
+    python benchmarks/bench_pipeline.py --baseline baseline.json --tolerance 1.25
+
+With --baseline the run exits with status 1 when the total or any stage of a
+size is slower than tolerance x the saved median.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures")
+sys.path.insert(0, os.path.dirname(HERE))
+
+SIZES = {"small": 40, "medium": 300, "large": 1500}  # sentences per document
+COPY_RATIO = 0.2  # share of document sentences taken from the fixture pages
+SLACK = 0.05  # seconds; keeps very short stages from failing on noise
+WORDS = ("model network training dataset accuracy feature layer gradient loss "
+         "optimizer sample learning prediction result analysis method system "
+         "evaluation baseline experiment error signal vector matrix kernel").split()
+
+
+def fixture_sentences():
+    out = []
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+                for para in re.findall(r"<p>(.*?)</p>", f.read(), re.S):
+                    out += re.split(r"(?<=\.)\s+", para.strip())
+    return out
+
+
+def make_document(rng, n_sent, copied):
+    sents = []
+    for _ in range(n_sent):
+        if rng.random() < COPY_RATIO:
+            sents.append(rng.choice(copied))
+        else:
+            sents.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + ".")
+    return " ".join(sents)
+
+
+def run_size(cd, metrics, EmbeddingStore, svc, doc, repeat, workdir):
+    runs = []
+    for i in range(repeat):
+        # A fresh embedding cache per run, so every repeat measures a cold analysis.
+        cd._store = EmbeddingStore(os.path.join(workdir, f"embed-{id(doc)}-{i}.sqlite3"), cd.EMBED_MODEL)
+        svc.counts.clear()
+        run = metrics.RunMetrics()
+        cd.analyse(main_txt=doc, run_metrics=run)
+        snap = run.snapshot()
+        snap["requests"] = dict(svc.counts)
+        runs.append(snap)
+    stages = sorted({s for r in runs for s in r["stages"]})
+    return {"words": len(doc.split()),
+            "total_seconds": round(statistics.median(r["total_seconds"] for r in runs), 4),
+            "stages": {s: round(statistics.median(r["stages"].get(s, 0.0) for r in runs), 4) for s in stages},
+            "counters": runs[-1]["counters"],
+            "gauges": runs[-1]["gauges"],
+            "requests": runs[-1]["requests"]}
+
+
+def print_report(results):
+    stages = [s for s in ("extract", "search", "plagiarism", "ai", "report")
+              if any(s in r["stages"] for r in results.values())]
+    print(f"{'size':<8}{'words':>8}{'total':>9}" + "".join(f"{s:>12}" for s in stages))
+    for size, r in results.items():
+        print(f"{size:<8}{r['words']:>8}{r['total_seconds']:>9.3f}"
+              + "".join(f"{r['stages'].get(s, 0.0):>12.3f}" for s in stages))
+    for size, r in results.items():
+        counters = ", ".join(f"{k}={v:g}" for k, v in sorted(r["counters"].items()))
+        gauges = ", ".join(f"{k}={v:g}" for k, v in sorted(r["gauges"].items()))
+        requests = ", ".join(f"{k}={v}" for k, v in sorted(r["requests"].items()))
+        print(f"\n[{size}] counters: {counters}\n[{size}] gauges: {gauges}\n[{size}] requests: {requests}")
+
+
+def regressions(results, baseline, tolerance):
+    out = []
+    for size, r in results.items():
+        base = baseline.get(size)
+        if not base:
+            continue
+        pairs = [("total", r["total_seconds"], base["total_seconds"])]
+        pairs += [(s, r["stages"].get(s, 0.0), t) for s, t in base["stages"].items()]
+        for name, now, before in pairs:
+            if now > before * tolerance + SLACK:
+                out.append(f"{size}/{name}: {now:.3f}s vs baseline {before:.3f}s")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default=",".join(SIZES), help="comma-separated subset of " + ", ".join(SIZES))
+    ap.add_argument("--repeat", type=int, default=1, help="runs per size; the median is reported")
+    ap.add_argument("--latency", type=float, default=0.02, help="seconds added to each fake API call")
+    ap.add_argument("--page-latency", type=float, default=0.05, help="seconds added to each page fetch")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--baseline", help="JSON from --save-baseline to compare against")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown factor vs the baseline")
+    ap.add_argument("--save-baseline", help="write the results to this JSON file")
+    ap.add_argument("--json", action="store_true", help="print the results as JSON only")
+    args = ap.parse_args()
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        ap.error(f"unknown size(s): {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    # The API limiters and caches read their settings at import time, so the
+    # environment has to be in place before core_detector is imported. The
+    # fake services don't rate-limit, so neither does the client; the result
+    # cache is off so every run does the full analysis.
+    os.environ.update({"GEMINI_RPS": "1000", "GEMINI_BURST": "1000", "GEMINI_CONCURRENCY": "8",
+                       "GEMINI_EMBED_RPS": "1000", "GEMINI_EMBED_BURST": "1000",
+                       "SERPER_RPS": "1000", "SERPER_BURST": "1000",
+                       "RESULT_CACHE_TTL": "0", "RESULT_CACHE_PATH": os.path.join(workdir, "results.sqlite3"),
+                       "EMBED_CACHE_PATH": os.path.join(workdir, "embed.sqlite3"),
+                       "LIMITER_DB_PATH": os.path.join(workdir, "limits.sqlite3"), "DEBUG": "false"})
+    from fake_services import FakeServices
+
+    svc = FakeServices(latency=args.latency, page_latency=args.page_latency, fixtures=FIXTURES).start()
+    os.environ.update(svc.env())
+    import core_detector as cd
+    import metrics
+    from embed_store import EmbeddingStore
+
+    rng = random.Random(args.seed)
+    copied = fixture_sentences()
+    results = {}
+    try:
+        for size in sizes:
+            doc = make_document(rng, SIZES[size], copied)
+            results[size] = run_size(cd, metrics, EmbeddingStore, svc, doc, args.repeat, workdir)
+    finally:
+        svc.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        if found:
+            print("\nRegressions (tolerance x%.2f):\n  " % args.tolerance + "\n  ".join(found))
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_search.py
+"""
+Serial vs concurrent web search (CONCURRENT_FETCH off/on) against the local
+fake Serper service and its generated pages, with latency added to every
+search and page request so the gain of overlapping them shows up.
+
+    python benchmarks/bench_search.py [--queries 12] [--latency 0.2] [--page-latency 0.3] [--repeat 2]
+
+Both paths must return the same number of pages, and the same pages in the
+same order when fewer than MAX_PAGES are found (past the cap, the concurrent
+path keeps the first pages to arrive); the run exits with status 1 otherwise.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def timed(fn, queries, repeat):
+    times, urls = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        hits = fn(queries)
+        times.append(time.perf_counter() - t0)
+        urls = [h["url"] for h in hits]
+    return statistics.median(times), urls
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--queries", type=int, default=12)
+    ap.add_argument("--latency", type=float, default=0.2, help="seconds added to each search call")
+    ap.add_argument("--page-latency", type=float, default=0.3, help="seconds added to each page fetch")
+    ap.add_argument("--repeat", type=int, default=2, help="runs per mode; the median is reported")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-search-")
+    # Limiter settings are read at import time; the fake service doesn't
+    # rate-limit, so neither does the client.
+    os.environ.update({"SERPER_RPS": "1000", "SERPER_BURST": "1000", "SERPER_CONCURRENCY": "16",
+                       "RESULT_CACHE_PATH": os.path.join(workdir, "results.sqlite3"),
+                       "EMBED_CACHE_PATH": os.path.join(workdir, "embed.sqlite3"),
+                       "COHORT_DB_PATH": os.path.join(workdir, "cohorts.sqlite3"),
+                       "LIMITER_DB_PATH": os.path.join(workdir, "limits.sqlite3"), "DEBUG": "false"})
+    from fake_services import FakeServices
+
+    # No fixtures: each query gets 10 of 50 generated pages, all on one host,
+    # so PER_HOST_LIMIT applies as it would to a single busy site.
+    svc = FakeServices(latency=args.latency, page_latency=args.page_latency).start()
+    os.environ.update(svc.env())
+    import core_detector as cd
+
+    queries = [f"benchmark query number {i}" for i in range(args.queries)]
+    try:
+        serial, serial_urls = timed(cd._run_search_serial, queries, args.repeat)
+        concurrent, concurrent_urls = timed(cd._run_search_concurrent, queries, args.repeat)
+    finally:
+        svc.stop()
+
+    print(f"{'mode':<12}{'pages':>7}{'seconds':>10}")
+    print(f"{'serial':<12}{len(serial_urls):>7}{serial:>10.2f}")
+    print(f"{'concurrent':<12}{len(concurrent_urls):>7}{concurrent:>10.2f}")
+    print(f"\nspeed-up: {serial / concurrent:.1f}x (MAX_PAGES={cd.MAX_PAGES}, "
+          f"SEARCH_WORKERS={cd.SEARCH_WORKERS}, FETCH_WORKERS={cd.FETCH_WORKERS}, PER_HOST_LIMIT={cd.PER_HOST_LIMIT})")
+    capped = len(serial_urls) >= cd.MAX_PAGES
+    if len(serial_urls) != len(concurrent_urls) or (not capped and serial_urls != concurrent_urls):
+        print("Serial and concurrent searches returned different pages.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
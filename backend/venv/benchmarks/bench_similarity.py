@@ -0,0 +1,118 @@
+# backend/benchmarks/bench_similarity.py
+"""
+Benchmark for core_detector.plagiarism() on a long document against 40 pages
+of search hits. Embeddings are replaced by deterministic hash vectors so the
+run is offline and repeatable; the original per-pair loop is kept below as
+the reference the batched engine must agree with.
+
+    python benchmarks/bench_similarity.py [--sentences 600] [--pages 40]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import core_detector as cd
+
+DIM = 768
+WORDS = ("model network training dataset accuracy feature layer gradient loss "
+         "optimizer sample learning prediction result analysis method system "
+         "evaluation baseline experiment error signal vector matrix kernel").split()
+
+
+def fake_embed(t):
+    seed = int.from_bytes(hashlib.sha256(t.encode()).digest()[:4], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).tolist()
+
+
+def make_text(rng, n_sent):
+    return " ".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+                    for _ in range(n_sent))
+
+
+def cos(a, b):
+    a, b = np.array(a), np.array(b)
+    return float(a @ b / (np.linalg.norm(a)*np.linalg.norm(b)+1e-6))
+
+
+def reference_plagiarism(doc, pages):
+    """The pre-vectorisation implementation, verbatim apart from names."""
+    sents = cd.sents
+    doc_chunks = [" ".join(sents(doc)[i:i+cd.WINDOW_SENT])
+                  for i in range(len(sents(doc))-cd.WINDOW_SENT)]
+    doc_vec = [cd.embed(c[:500]) for c in doc_chunks]
+    overlaps, word_overlap, per_url = [], 0, defaultdict(int)
+    for pg in pages:
+        if not pg["text"]:
+            continue
+        pg_chunks = [" ".join(sents(pg["text"])[i:i+cd.WINDOW_SENT])
+                     for i in range(len(sents(pg["text"]))-cd.WINDOW_SENT)]
+        for ch in pg_chunks:
+            if per_url[pg["url"]] >= cd.MAX_OVERL_URL:
+                break
+            fuzz_sc = fuzz.token_set_ratio(ch, doc)
+            if fuzz_sc < cd.TH_FUZZ:
+                continue
+            v = cd.embed(ch[:500])
+            cos_sc = max(cos(v, dv) for dv in doc_vec) if doc_vec else 0
+            if cos_sc < cd.TH_COS:
+                continue
+            overlaps.append((ch[:180]+"…", fuzz_sc, round(cos_sc, 2), pg["url"]))
+            word_overlap += len(ch.split())
+            per_url[pg["url"]] += 1
+    orig = max(0, 100 - word_overlap/max(1, len(doc.split()))*100)
+    return orig, sorted(overlaps, key=lambda x: (-x[1], -x[2]))
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sentences", type=int, default=600)
+    ap.add_argument("--pages", type=int, default=40)
+    ap.add_argument("--page-sentences", type=int, default=150)
+    ap.add_argument("--th-cos", type=float, default=0.08,
+                    help="random vectors rarely reach the production threshold")
+    args = ap.parse_args()
+
+    rng = random.Random(7)
+    doc = make_text(rng, args.sentences)
+    doc_sents = cd.sents(doc)
+    pages = []
+    for i in range(args.pages):
+        text = make_text(rng, args.page_sentences)
+        # splice some of the document into every other page
+        if i % 2 == 0:
+            start = rng.randrange(0, len(doc_sents) - 12)
+            text += " " + " ".join(doc_sents[start:start + 12])
+        pages.append({"url": f"https://example.org/{i}", "text": text})
+
+    cd.embed_many = lambda texts: [fake_embed(t) for t in texts]
+    cd.TH_COS = args.th_cos
+
+    ref, t_ref = timed(reference_plagiarism, doc, pages)
+    new, t_new = timed(cd.plagiarism, doc, pages)
+
+    same = abs(ref[0] - new[0]) < 1e-9 and ref[1] == new[1]
+    print(f"document: {len(doc.split())} words, {len(doc_sents)} sentences; pages: {len(pages)}")
+    print(f"reference loop : {t_ref:8.3f}s  ({len(ref[1])} overlaps, originality {ref[0]:.2f})")
+    print(f"batched engine : {t_new:8.3f}s  ({len(new[1])} overlaps, originality {new[0]:.2f})")
+    print(f"speed-up       : {t_ref / max(t_new, 1e-9):8.1f}x")
+    print(f"outputs match  : {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+# backend/cohort.py
+"""
+MinHash/LSH index for comparing a cohort of submissions (e.g. one class's
+assignments) with each other.
+
+Every sentence window of a document is reduced to a MinHash signature over
+its word shingles. The signature is cut into bands and each band is hashed
+into a bucket; windows that share a bucket with a window of another document
+become candidate pairs. Only candidates are scored with the fuzzy and cosine
+checks, so the work grows with the number of similar windows rather than
+with the square of the cohort size.
+
+The index, the window texts and the confirmed matches live in SQLite, so a
+cohort can be extended later and new submissions are checked against
+everything already in it.
+"""
+
+import re
+import sqlite3
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32          # 4 rows per band: windows with Jaccard similarity ≳ 0.4 usually collide
+SHINGLE_WORDS = 3
+MAX_PAIR_CITATIONS = 10
+SIGNATURE_BATCH = 256  # windows per signature batch: ~15 MB per temporary array at 60 words
+
+_PRIME = np.uint64((1 << 61) - 1)
+# Fixed seed: signatures must stay comparable across processes and restarts.
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+_MIX = _rng.integers(1, 1 << 63, NUM_PERM // BANDS, dtype=np.uint64) | np.uint64(1)
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> List[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= k:
+        return [" ".join(words)] if words else []
+    return list({" ".join(words[i:i+k]) for i in range(len(words) - k + 1)})
+
+
+def signatures(texts: List[str], batch: int = SIGNATURE_BATCH) -> List[Optional[np.ndarray]]:
+    """MinHash signatures of the texts' word shingles (None for texts without
+    words), computed `batch` texts at a time to bound the size of the
+    shingle x permutation matrix."""
+    out: List[Optional[np.ndarray]] = []
+    for i in range(0, len(texts), batch):
+        out += _signature_batch(texts[i:i+batch])
+    return out
+
+
+def _signature_batch(texts: List[str]) -> List[Optional[np.ndarray]]:
+    hashed = [[zlib.crc32(s.encode("utf-8")) for s in shingles(t)] for t in texts]
+    nonempty = [i for i, h in enumerate(hashed) if h]
+    out: List[Optional[np.ndarray]] = [None] * len(texts)
+    if not nonempty:
+        return out
+    hv = np.fromiter((h for i in nonempty for h in hashed[i]), dtype=np.uint64)
+    starts = np.cumsum([0] + [len(hashed[i]) for i in nonempty[:-1]])
+    # a, b and the shingle hashes are all below 2**32, so a*h + b cannot overflow.
+    mins = np.minimum.reduceat((np.outer(hv, _A) + _B) % _PRIME, starts, axis=0)
+    for i, sig in zip(nonempty, mins):
+        out[i] = sig
+    return out
+
+
+def band_keys(sig: np.ndarray) -> List[int]:
+    # uint64 arithmetic wraps around, which is fine for a bucket hash.
+    return (sig.reshape(BANDS, -1) * _MIX).sum(axis=1).view(np.int64).tolist()
+
+
+class CohortIndex:
+    def __init__(self, path: str):
+        self.path = path
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cohorts ("
+                         " id TEXT PRIMARY KEY, owner TEXT, name TEXT, created_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS documents ("
+                         " id INTEGER PRIMARY KEY AUTOINCREMENT, cohort_id TEXT, name TEXT,"
+                         " words INTEGER, windows INTEGER, added_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS windows ("
+                         " id INTEGER PRIMARY KEY AUTOINCREMENT, doc_id INTEGER, idx INTEGER, text TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                         " cohort INTEGER, band INTEGER, key INTEGER, window_id INTEGER,"
+                         " PRIMARY KEY (cohort, band, key, window_id)) WITHOUT ROWID")
+            conn.execute("CREATE TABLE IF NOT EXISTS matches ("
+                         " cohort_id TEXT, window_a INTEGER, window_b INTEGER, fuzz REAL, cos REAL,"
+                         " PRIMARY KEY (window_a, window_b))")
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_cohort ON documents (cohort_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS windows_doc ON windows (doc_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS matches_cohort ON matches (cohort_id)")
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        # Closed explicitly rather than whenever garbage collection gets to it.
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-65536")  # 64 MB: bucket lookups and inserts hit random pages
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, owner: str, name: str) -> str:
+        cohort_id = uuid.uuid4().hex
+        with self._conn() as conn:
+            conn.execute("INSERT INTO cohorts (id, owner, name, created_at) VALUES (?, ?, ?, ?)",
+                         (cohort_id, owner, name, time.time()))
+        return cohort_id
+
+    def delete(self, cohort_id: str):
+        """Removes the cohort with its documents, index entries and matches."""
+        self.remove_documents(d["id"] for d in self.documents(cohort_id))
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cohorts WHERE id = ?", (cohort_id,))
+
+    def get(self, cohort_id: str) -> Optional[Dict[str, Any]]:
+        with self._conn() as conn:
+            row = conn.execute("SELECT * FROM cohorts WHERE id = ?", (cohort_id,)).fetchone()
+        return dict(row) if row else None
+
+    def documents(self, cohort_id: str) -> List[Dict[str, Any]]:
+        with self._conn() as conn:
+            rows = conn.execute("SELECT id, name, words, windows, added_at FROM documents"
+                                " WHERE cohort_id = ? ORDER BY id", (cohort_id,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def add_documents(self, cohort_id: str, documents: List[Tuple[str, int, List[str]]]) \
+            -> Tuple[List[int], List[Tuple[int, int]]]:
+        """Indexes (name, word count, windows) documents in order. Returns their
+        ids and the candidate pairs (new window id, earlier window id) they form
+        with every document indexed before them, in this call or earlier."""
+        with self._conn() as conn:
+            # One write transaction: two batches added at the same time still
+            # see each other, and each index page is written once per batch.
+            conn.execute("BEGIN IMMEDIATE")
+            # Buckets use the cohort's rowid: far smaller index rows than the hex id.
+            cohort = conn.execute("SELECT rowid FROM cohorts WHERE id = ?", (cohort_id,)).fetchone()[0]
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS probe (window_id INTEGER, band INTEGER, key INTEGER)")
+            doc_ids, candidates = [], []
+            for name, words, chunks in documents:
+                doc_id = conn.execute("INSERT INTO documents (cohort_id, name, words, windows, added_at)"
+                                      " VALUES (?, ?, ?, ?, ?)",
+                                      (cohort_id, name, words, len(chunks), time.time())).lastrowid
+                doc_ids.append(doc_id)
+                probe = []
+                for idx, (ch, sig) in enumerate(zip(chunks, signatures(chunks))):
+                    wid = conn.execute("INSERT INTO windows (doc_id, idx, text) VALUES (?, ?, ?)",
+                                       (doc_id, idx, ch)).lastrowid
+                    if sig is not None:
+                        probe += [(wid, band, key) for band, key in enumerate(band_keys(sig))]
+                conn.execute("DELETE FROM probe")
+                conn.executemany("INSERT INTO probe VALUES (?, ?, ?)", probe)
+                candidates += conn.execute(
+                    "SELECT DISTINCT p.window_id, b.window_id FROM probe p JOIN buckets b"
+                    " ON b.cohort = ? AND b.band = p.band AND b.key = p.key", (cohort,)).fetchall()
+                conn.executemany("INSERT INTO buckets (cohort, band, key, window_id) VALUES (?, ?, ?, ?)",
+                                 [(cohort, band, key, wid) for wid, band, key in probe])
+        return doc_ids, [tuple(c) for c in candidates]
+
+    def remove_documents(self, doc_ids: Iterable[int]):
+        with self._conn() as conn:
+            for doc_id in doc_ids:
+                wids = "SELECT id FROM windows WHERE doc_id = ?"
+                conn.execute(f"DELETE FROM buckets WHERE window_id IN ({wids})", (doc_id,))
+                conn.execute(f"DELETE FROM matches WHERE window_a IN ({wids}) OR window_b IN ({wids})",
+                             (doc_id, doc_id))
+                conn.execute("DELETE FROM windows WHERE doc_id = ?", (doc_id,))
+                conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def window_texts(self, window_ids: Iterable[int]) -> Dict[int, str]:
+        ids = list(window_ids)
+        out = {}
+        with self._conn() as conn:
+            for i in range(0, len(ids), 500):
+                part = ids[i:i+500]
+                out.update(conn.execute(f"SELECT id, text FROM windows WHERE id IN ({','.join('?' * len(part))})",
+                                        part).fetchall())
+        return out
+
+    def add_matches(self, cohort_id: str, matches: List[Tuple[int, int, float, float]]):
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO matches (cohort_id, window_a, window_b, fuzz, cos)"
+                             " VALUES (?, ?, ?, ?, ?)", [(cohort_id, *m) for m in matches])
+
+    def report(self, cohort_id: str, max_citations: int = MAX_PAIR_CITATIONS) -> Dict[str, Any]:
+        """Similarity matrix and per-pair citations over the whole cohort.
+
+        matrix[i][j] is the share (%) of document i's windows that have a
+        confirmed match in document j; it is not symmetric when one document
+        copies only part of another."""
+        docs = self.documents(cohort_id)
+        pos = {d["id"]: i for i, d in enumerate(docs)}
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT wa.doc_id AS doc_a, wa.id AS win_a, wa.text AS text_a,"
+                " wb.doc_id AS doc_b, wb.id AS win_b, wb.text AS text_b, m.fuzz, m.cos"
+                " FROM matches m JOIN windows wa ON wa.id = m.window_a JOIN windows wb ON wb.id = m.window_b"
+                " WHERE m.cohort_id = ?", (cohort_id,)).fetchall()
+        covered = defaultdict(set)  # (doc, other doc) -> windows of doc matched in other doc
+        cites = defaultdict(list)
+        for r in rows:
+            covered[(r["doc_a"], r["doc_b"])].add(r["win_a"])
+            covered[(r["doc_b"], r["doc_a"])].add(r["win_b"])
+            a, b = sorted((r["doc_a"], r["doc_b"]))
+            first, second = (r["text_a"], r["text_b"]) if a == r["doc_a"] else (r["text_b"], r["text_a"])
+            cites[(a, b)].append({"a": first[:180] + "…", "b": second[:180] + "…",
+                                  "fuzz": r["fuzz"], "cos": r["cos"]})
+
+        matrix = [[0.0] * len(docs) for _ in docs]
+        for (d, other), wins in covered.items():
+            if d in pos and other in pos:
+                matrix[pos[d]][pos[other]] = round(100 * len(wins) / max(1, docs[pos[d]]["windows"]), 1)
+        pairs = []
+        for (a, b), found in cites.items():
+            found.sort(key=lambda c: (-c["fuzz"], -c["cos"]))
+            pairs.append({"a": a, "b": b,
+                          "similarity": max(matrix[pos[a]][pos[b]], matrix[pos[b]][pos[a]]),
+                          "matches": len(found), "citations": found[:max_citations]})
+        pairs.sort(key=lambda p: -p["similarity"])
+        return {"cohort": self.get(cohort_id), "documents": docs, "matrix": matrix, "pairs": pairs}
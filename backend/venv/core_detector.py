@@ -0,0 +1,827 @@
+# backend/core_detector.py
+"""
+This file contains the core plagiarism detection logic.
+It is intended to be imported as a module by a web server (e.g., Flask).
+"""
+
+# NO LONGER INCLUDES NUMPY VERSION CHECK/DOWNGRADE LOGIC.
+# This was causing compilation issues and is best handled by requirements.txt.
+
+import os
+import re
+import io
+import tempfile
+import requests
+import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+import google.generativeai as genai
+import nltk
+from collections import Counter, deque
+from typing import List, Dict, Tuple, Any, Optional, Callable, Iterable, Iterator
+from slugify import slugify
+import pandas as pd
+from tabulate import tabulate
+from dotenv import load_dotenv; load_dotenv()
+
+# Removed imports for visualization: matplotlib, seaborn, sklearn
+# Removed imports for Gradio: gradio
+# Removed imports for v4p: openai, mimetypes, datetime, inch, letter, ParagraphStyle, rapidfuzz_process
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # e.g. a local fake_services.py
+if GOOGLE_API_KEY and GEMINI_API_ENDPOINT:
+    genai.configure(api_key=GOOGLE_API_KEY, transport="rest",
+                    client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+elif GOOGLE_API_KEY:
+    genai.configure(api_key=GOOGLE_API_KEY)
+SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true")
+
+# Load NLTK stopwords
+user_specific_stopwords = ["data", "learning", "prediction", "machine", "link", "model", "using", "based"]
+try:
+    from nltk.corpus import stopwords
+    STOPWORDS = set(stopwords.words('english'))
+    STOPWORDS.update(user_specific_stopwords)
+except ImportError:
+    if DEBUG: print("NLTK library not found. Please ensure it's installed. Falling back to a basic stopword list.")
+    STOPWORDS = set(["a", "an", "the", "is", "in", "it", "of", "on", "and", "to", "with",'i', 'me', 'my', 'myself', 'we', 'our', 'ours','ourselves', 'you', "you're", "you've", "you'll", "you'd", 'your', 'yours', 'yourself','yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 'her', 'hers', 'herself','it', "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves','what', 'which', 'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are','was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing','a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for','with', 'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to','from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once','here', 'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most','other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very','s', 't', 'can', 'will', 'just', 'don', "don't", 'should', "should've", 'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't", 'couldn', "couldn't", 'didn', "didn't", 'doesn', "doesn't",'hadn', "hadn't", 'hasn', "hasn't", 'haven', "haven't", 'isn', "isn't", 'ma', 'mightn', "mightn't", 'mustn', "mustn't", 'needn', "needn't", 'shan', "shan't", 'shouldn', "shouldn't", 'wasn', "wasn't", 'weren', "weren't", 'won', "won't", 'wouldn', "wouldn't"] + user_specific_stopwords)
+
+except LookupError:
+    if DEBUG: print("NLTK stopwords resource not found. Attempting to download...")
+    try:
+        nltk.download('stopwords', quiet=True)
+        from nltk.corpus import stopwords
+        STOPWORDS = set(stopwords.words('english'))
+        STOPWORDS.update(user_specific_stopwords)
+    except Exception as e:
+        if DEBUG: print(f"Failed to download NLTK stopwords: {e}. Falling back to a basic stopword list.")
+        STOPWORDS = set(["a", "an", "the", "is", "in", "it", "of", "on", "and", "to", "with",'i', 'me', 'my', 'myself', 'we', 'our', 'ours','ourselves', 'you', "you're", "you've", "you'll", "you'd", 'your', 'yours', 'yourself','yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 'her', 'hers', 'herself','it', "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves','what', 'which', 'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are','was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing','a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for','with', 'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to','from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once','here', 'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most','other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very','s', 't', 'can', 'will', 'just', 'don', "don't", 'should', "should've", 'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't", 'couldn', "couldn't", 'didn', "didn't", 'doesn', "doesn't",'hadn', "hadn't", 'hasn', "hasn't", 'haven', "haven't", 'isn', "isn't", 'ma', 'mightn', "mightn't", 'mustn', "mustn't", 'needn', "needn't", 'shan', "shan't", 'shouldn', "shouldn't", 'wasn', "wasn't", 'weren', "weren't", 'won', "won't", 'wouldn', "wouldn't"] + user_specific_stopwords)
+
+# PDF and Docx imports:
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+from docx import Document
+from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table,
+                                PageBreak,TableStyle)
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib import colors
+import numpy as np
+from bs4 import BeautifulSoup
+from rapidfuzz import fuzz, process
+from embed_store import EmbeddingStore
+from result_cache import ResultCache, result_key
+from cohort import CohortIndex
+from api_clients import gemini, gemini_embed, serper
+import metrics
+from contextlib import contextmanager
+
+# ─────────── tuning knobs ───────────
+MAX_QUERIES   = 12
+MAX_PAGES     = 40
+WINDOW_SENT   = 3
+TH_FUZZ       = 55
+TH_COS        = 0.40
+MAX_OVERL_URL = 6
+CONCURRENT_FETCH = os.getenv("CONCURRENT_FETCH", "true").lower() in ("1", "true")
+SEARCH_WORKERS = 4     # parallel Serper queries
+FETCH_WORKERS  = 12    # parallel page downloads
+PER_HOST_LIMIT = 2     # simultaneous connections to one host
+PDF_PARALLEL_PAGES = 30  # PDFs with more pages are extracted in a process pool
+PDF_WORKERS    = min(4, os.cpu_count() or 1)
+PDF_BATCH      = 8     # pages per process-pool task
+# ────────────────────────────────────
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))  # seconds
+_results = ResultCache(
+    os.getenv("RESULT_CACHE_PATH", os.path.join(tempfile.gettempdir(), "plagiarism_results.sqlite3")),
+    RESULT_CACHE_TTL,
+)
+_cohorts = CohortIndex(
+    os.getenv("COHORT_DB_PATH", os.path.join(tempfile.gettempdir(), "plagiarism_cohorts.sqlite3")))
+
+styles = getSampleStyleSheet()
+S, H3, H2 = styles["Normal"], styles["Heading3"], styles["Heading2"]
+
+# ─────────── file → text ───────────
+def _pdf_pages(path: str, page_numbers=None) -> Iterator[str]:
+    """Text of each page in turn, with pdfminer's default layout analysis."""
+    with open(path, "rb") as fp:
+        rsrcmgr = PDFResourceManager()
+        out = io.StringIO()
+        device = TextConverter(rsrcmgr, out, laparams=LAParams())
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        for page in PDFPage.get_pages(fp, page_numbers):
+            interpreter.process_page(page)
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate(0)
+
+def _pdf_page_batch(path: str, first: int, last: int) -> List[str]:
+    return list(_pdf_pages(path, range(first, last)))
+
+def _pdf_pages_parallel(path: str, n_pages: int) -> Iterator[str]:
+    """Extracts page batches in a process pool, yielding pages in order.
+    At most 2*PDF_WORKERS batches are pending, which bounds memory."""
+    with ProcessPoolExecutor(PDF_WORKERS) as pool:
+        starts = iter(range(0, n_pages, PDF_BATCH))
+        pending = deque()
+        for first in starts:
+            pending.append(pool.submit(_pdf_page_batch, path, first, min(first + PDF_BATCH, n_pages)))
+            if len(pending) >= 2 * PDF_WORKERS:
+                break
+        while pending:
+            pages = pending.popleft().result()
+            nxt = next(starts, None)
+            if nxt is not None:
+                pending.append(pool.submit(_pdf_page_batch, path, nxt, min(nxt + PDF_BATCH, n_pages)))
+            yield from pages
+
+def iter_text_file(path: str) -> Iterator[str]:
+    """Yields a file's text piece by piece (PDF pages, DOCX paragraphs, text
+    blocks); "".join() of the pieces equals extract_text_file(path)."""
+    lower = path.lower()
+    if lower.endswith(".pdf"):
+        with open(path, "rb") as fp:
+            n_pages = sum(1 for _ in PDFPage.get_pages(fp))
+        if n_pages > PDF_PARALLEL_PAGES and PDF_WORKERS > 1:
+            yield from _pdf_pages_parallel(path, n_pages)
+        else:
+            yield from _pdf_pages(path)
+    elif lower.endswith((".docx", ".doc")):
+        for i, p in enumerate(Document(path).paragraphs):
+            yield p.text if i == 0 else " " + p.text
+    else:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            yield from iter(lambda: f.read(64 * 1024), "")
+
+def extract_text_file(path: str) -> str:
+    return "".join(iter_text_file(path))
+
+# ─────────── stats & keywords ───────────
+def doc_stats(txt: str) -> Dict[str, int]:
+    words = re.findall(r"\w+", txt)
+    sents = re.split(r"(?<=[.!?])\s+", txt)
+    return {"words": len(words), "sentences": len(sents),
+            "avg_sent_len": round(len(words)/max(1, len(sents)), 1)}
+
+def top_keywords(txt: str, k: int = 20):
+    tokens = [w.lower() for w in re.findall(r"[A-Za-z]{4,}", txt)]
+    return Counter(tokens).most_common(k)
+
+# ─────────── embeddings cache ───────────
+EMBED_MODEL = "models/embedding-001"
+EMBED_BATCH = 100   # texts per batchEmbedContents request
+_store = EmbeddingStore(
+    os.getenv("EMBED_CACHE_PATH", os.path.join(tempfile.gettempdir(), "plagiarism_embeddings.sqlite3")),
+    EMBED_MODEL,
+    max_items=int(os.getenv("EMBED_CACHE_ITEMS", "50000")),
+)
+
+def embed_many(texts: List[str]) -> List[np.ndarray]:
+    """Embeds texts, sending every cache miss in as few batch requests as possible."""
+    vecs = _store.get_many(texts)
+    misses = list(dict.fromkeys(t for t, v in zip(texts, vecs) if v is None))
+    metrics.incr("embed_cache_hits", len(texts) - sum(v is None for v in vecs))
+    metrics.incr("embed_cache_misses", len(misses))
+    fresh = {}
+    for i in range(0, len(misses), EMBED_BATCH):
+        batch = misses[i:i+EMBED_BATCH]
+        result = gemini_embed.call(genai.embed_content, model=EMBED_MODEL, content=batch)
+        fresh.update(zip(batch, result['embedding']))
+    if fresh:
+        _store.put_many(fresh)
+        vecs = [v if v is not None else np.asarray(fresh[t], dtype=np.float32)
+                for t, v in zip(texts, vecs)]
+    return vecs
+
+def embed(t: str) -> np.ndarray:
+    return embed_many([t])[0]
+
+# ─────────── Web search agent ───────────
+def _serper_norm_hits(response_json: dict) -> List[Dict[str, str]]:
+    """Parses Serper API JSON response into a standard format."""
+    out = []
+    if not response_json or 'organic' not in response_json:
+        return out
+    for item in response_json['organic']:
+        out.append({
+            "url": item.get('link'),
+            "title": item.get('title'),
+            "snippet": item.get('snippet')
+        })
+    return out
+
+def _build_queries(txt):
+    title = txt.splitlines()[0][:120]
+    gemini_queries = []
+
+    abstract_match = re.search(
+        r'^Abstract\s*?\n([\s\S]+?)(?=\n\n|\n[A-ZÀ-Ü][^a-zà-ü\s]+\s*:|\nI\.\s|\n1\.\s|$)',
+        txt, re.IGNORECASE | re.MULTILINE
+    )
+    text_sample = ""
+    if abstract_match:
+        text_sample = abstract_match.group(1).strip()
+        if DEBUG: print(f"Found abstract for Gemini query generation: {len(text_sample)} chars")
+    else:
+        if DEBUG: print("No abstract found, using first ~400 words for Gemini query generation.")
+        text_sample = " ".join(txt.split()[:400])
+    
+    text_sample = text_sample[:2000]
+
+    if GOOGLE_API_KEY and text_sample:
+        model = genai.GenerativeModel('gemini-1.5-flash')
+        prompt = f"""Given the following text, please generate a list of 5 to 7 effective search query phrases that would be useful for finding similar documents or checking for prior work on the main topics discussed. Each query phrase should be on a new line. Avoid very generic terms if better, more specific phrases can be derived from the text.
+
+Text:
+---
+{text_sample}
+---
+
+Search Query Phrases:"""
+        try:
+            response = gemini.call(model.generate_content, prompt)
+            if response.text:
+                gemini_queries = [q.strip() for q in response.text.split('\n') if q.strip() and len(q.strip()) > 3]
+                if DEBUG: print(f"Gemini generated queries: {gemini_queries}")
+        except Exception as e:
+            if DEBUG: print(f"Error calling Gemini for query generation: {e}")
+    
+    if not gemini_queries:
+        if DEBUG: print("Gemini query generation failed or returned no (valid) queries. Falling back to keyword-based queries.")
+        kws = [w for w, _ in Counter(re.findall(r"[A-Za-z]{4,}", txt.lower())).most_common(30)]
+        filtered_kws = [kw for kw in kws if kw not in STOPWORDS]
+        gemini_queries = filtered_kws
+
+    final_queries = [title]
+    for q in gemini_queries:
+        if q.lower() != title.lower() and q.lower() not in [fq.lower() for fq in final_queries]:
+            final_queries.append(q)
+            if len(final_queries) >= MAX_QUERIES:
+                break 
+    
+    return final_queries[:MAX_QUERIES]
+
+# ─────────── page fetching ───────────
+_http = threading.local()
+_host_locks: Dict[str, threading.Semaphore] = {}
+_host_locks_guard = threading.Lock()
+# Shared by all searches of the process, so the threads and their keep-alive
+# sessions are reused instead of being rebuilt per analysis.
+_search_pool = ThreadPoolExecutor(SEARCH_WORKERS, thread_name_prefix="serper")
+_fetch_pool = ThreadPoolExecutor(FETCH_WORKERS, thread_name_prefix="fetch")
+
+def _session() -> requests.Session:
+    """One pooled keep-alive session per thread."""
+    if not hasattr(_http, "session"):
+        s = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=FETCH_WORKERS,
+                                                pool_maxsize=PER_HOST_LIMIT)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        s.headers["User-Agent"] = "Mozilla/5.0"
+        _http.session = s
+    return _http.session
+
+def _host_slot(u: str) -> threading.Semaphore:
+    host = urlparse(u).netloc.lower()
+    with _host_locks_guard:
+        if host not in _host_locks:
+            _host_locks[host] = threading.Semaphore(PER_HOST_LIMIT)
+        return _host_locks[host]
+
+def _html_to_text(html: str, limit: int = 30_000) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    for t in soup(["script", "style", "noscript"]):
+        t.decompose()
+    return soup.get_text(" ", strip=True)[:limit]
+
+def _bs_fetch(u, limit=30_000):
+    try:
+        with _host_slot(u):
+            response = _session().get(u, timeout=8)
+        metrics.incr("pages_fetched")
+        metrics.incr("bytes_fetched", len(response.content))
+        return _html_to_text(response.text, limit)
+    except Exception as e:
+        if DEBUG: print(f"Error fetching URL {u}: {e}")
+        return ""
+
+def _serper_search(q: str) -> List[Dict[str, str]]:
+    headers = {'X-API-KEY': SERPER_API_KEY, 'Content-Type': 'application/json'}
+
+    def post():
+        response = _session().post(SERPER_URL, headers=headers, json={"q": q, "num": 10}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    return _serper_norm_hits(serper.call(post))
+
+def _run_search_serial(queries):
+    hits = {}
+    for q_idx, q in enumerate(queries):
+        if DEBUG: print(f"Searching query {q_idx+1}/{len(queries)} (Serper): {q}")
+        try:
+            for h in _serper_search(q):
+                if len(hits) >= MAX_PAGES:
+                    break
+                if h["url"] and h["url"] not in hits:
+                    h["text"] = _bs_fetch(h["url"])
+                    if h["text"]:
+                        hits[h["url"]] = h
+
+            if len(hits) >= MAX_PAGES:
+                if DEBUG: print(f"Reached MAX_PAGES ({MAX_PAGES}). Stopping search.")
+                break
+        except requests.exceptions.RequestException as e:
+            if DEBUG: print(f"Error calling Serper API for query '{q}': {e}")
+            continue
+        except Exception as e:
+            if DEBUG: print(f"Generic error processing query '{q}' with Serper: {e}")
+            continue
+    return list(hits.values())
+
+def _run_search_concurrent(queries):
+    """
+    Runs all queries in parallel and streams every new hit straight into a
+    bounded fetch pool. Stops as soon as MAX_PAGES usable pages are in; the
+    result keeps the serial ordering: each page sorts by the best (query rank,
+    hit rank) it got from any search, whichever search answered first.
+    """
+    hits: Dict[str, Dict[str, str]] = {}
+    rank: Dict[str, Tuple[int, int]] = {}
+    done = threading.Event()
+    pending = set()
+
+    def fetch(h):
+        if done.is_set():
+            return h, ""
+        return h, _bs_fetch(h["url"])
+
+    try:
+        searches = {_search_pool.submit(metrics.bind(_serper_search), q): q_idx for q_idx, q in enumerate(queries)}
+        pending = set(searches)
+        while pending and not done.is_set():
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                if fut in searches:
+                    q = queries[searches[fut]]
+                    try:
+                        parsed_hits = fut.result()
+                    except requests.exceptions.RequestException as e:
+                        if DEBUG: print(f"Error calling Serper API for query '{q}': {e}")
+                        continue
+                    except Exception as e:
+                        if DEBUG: print(f"Generic error processing query '{q}' with Serper: {e}")
+                        continue
+                    for h_idx, h in enumerate(parsed_hits):
+                        if not h["url"]:
+                            continue
+                        if h["url"] in rank:
+                            rank[h["url"]] = min(rank[h["url"]], (searches[fut], h_idx))
+                        else:
+                            rank[h["url"]] = (searches[fut], h_idx)
+                            pending.add(_fetch_pool.submit(metrics.bind(fetch), h))
+                    continue
+
+                h, text = fut.result()
+                if text and len(hits) < MAX_PAGES:
+                    h["text"] = text
+                    hits[h["url"]] = h
+                    if len(hits) >= MAX_PAGES:
+                        if DEBUG: print(f"Reached MAX_PAGES ({MAX_PAGES}). Stopping search.")
+                        done.set()
+    finally:
+        done.set()
+        for fut in pending:
+            fut.cancel()
+
+    return [hits[u] for u in sorted(hits, key=rank.get)]
+
+def run_search(txt):
+    queries = _build_queries(txt)
+
+    if not SERPER_API_KEY:
+        if DEBUG:
+            print("Warning: SERPER_API_KEY not set. Skipping web search.")
+        return [], queries
+
+    if CONCURRENT_FETCH:
+        return _run_search_concurrent(queries), queries
+    return _run_search_serial(queries), queries
+
+# ─────────── AI probability ───────────
+AI_ERROR_REASON = "Error calling Gemini API."
+
+def detect_ai(txt):
+    model = genai.GenerativeModel('gemini-1.5-flash')
+    prompt = (
+        "Analyze the following text and estimate the probability that it was AI-generated. "
+        "Return your answer as '<percentage>% – <brief reason>'. "
+        "For example: '85% – The text exhibits repetitive sentence structures and a lack of personal anecdotes.'\n\n"
+        "Text:\n" + txt[:4096]
+    )
+    try:
+        response = gemini.call(model.generate_content, prompt)
+        line = response.text.split("\n")[0]
+    except Exception as e:
+        if DEBUG: print(f"Gemini API call failed: {e}")
+        return 50.0, AI_ERROR_REASON
+
+    m = re.search(r"(\d{1,3})", line)
+    probability = float(m.group(1)) if m else 50.0
+    reason = line.split("–", 1)[-1].strip() if "–" in line else "Could not parse reason."
+    
+    return probability, reason
+
+# ─────────── plagiarism detection ───────────
+def sents(t):
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+", t) if s.strip()]
+def windows(ss, n=WINDOW_SENT):
+    return [" ".join(ss[i:i+n]) for i in range(len(ss)-n)]
+
+_SENT_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+def iter_sents(pieces: Iterable[str]) -> Iterator[str]:
+    """Streaming sents(): yields the same sentences as sents("".join(pieces))."""
+    tail = ""
+    for piece in pieces:
+        parts = _SENT_SPLIT.split(tail + piece)
+        tail = parts.pop()  # may still continue in the next piece
+        for s in parts:
+            if s.strip():
+                yield s.strip()
+    if tail.strip():
+        yield tail.strip()
+
+def iter_windows(ss: Iterable[str], n=WINDOW_SENT) -> Iterator[str]:
+    """Streaming windows(): a window is emitted once the sentence after it arrives."""
+    buf = deque(maxlen=n+1)
+    for s in ss:
+        buf.append(s)
+        if len(buf) == n+1:
+            yield " ".join(list(buf)[:n])
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size in MB where it is cheap to read (Linux), else None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class StreamedDoc:
+    """
+    Reads a document from an iterator of text pieces. Sentence windows are cut
+    as the pieces arrive and sent off for embedding in EMBED_BATCH-sized
+    groups on a background thread, so embedding overlaps with extraction and
+    with the web search that follows. Windows embedded before (e.g. for an
+    earlier run of the same document) come from the embedding store and cost
+    no API calls.
+    """
+    def __init__(self, pieces: Iterable[str]):
+        self._embedder = ThreadPoolExecutor(1)
+        self._batches = []
+        self.chunks: List[str] = []
+        parts, n_pieces = [], 0
+        rss_start = rss_peak = _rss_mb()
+
+        def tee():
+            nonlocal n_pieces, rss_peak
+            for piece in pieces:
+                n_pieces += 1
+                parts.append(piece)
+                if rss_peak is not None:
+                    rss_peak = max(rss_peak, _rss_mb() or 0)
+                yield piece
+
+        batch = []
+        for ch in iter_windows(iter_sents(tee())):
+            self.chunks.append(ch)
+            batch.append(ch[:500])
+            if len(batch) == EMBED_BATCH:
+                self._batches.append(self._embedder.submit(metrics.bind(embed_many), batch))
+                batch = []
+        if batch:
+            self._batches.append(self._embedder.submit(metrics.bind(embed_many), batch))
+        self._embedder.shutdown(wait=False)
+
+        self.text = "".join(parts).strip()
+        self.stats = {"pieces": n_pieces, "chars": len(self.text), "windows": len(self.chunks)}
+        if rss_start is not None:
+            # Growth over this document's extraction, sampled once per page.
+            self.stats["rss_growth_mb"] = round(max(rss_peak, _rss_mb() or 0) - rss_start, 1)
+            metrics.peak("extract_rss_growth_mb", self.stats["rss_growth_mb"])
+        if DEBUG: print(f"Extracted document: {self.stats}")
+
+    def vectors(self) -> List[np.ndarray]:
+        return [v for fut in self._batches for v in fut.result()]
+
+def _unit_rows(vectors) -> np.ndarray:
+    """Stack vectors into a float32 matrix with L2-normalised rows."""
+    m = np.asarray(vectors, dtype=np.float32)
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-6)
+
+def plagiarism(doc, pages, streamed: Optional[StreamedDoc] = None):
+    if streamed is not None:
+        doc_chunks, doc_vecs = streamed.chunks, streamed.vectors()
+    else:
+        doc_chunks = windows(sents(doc))
+        doc_vecs = embed_many([c[:500] for c in doc_chunks])
+    doc_mat = _unit_rows(doc_vecs) if doc_chunks else None
+
+    # Fuzzy stage: the document is preprocessed once and scored against every
+    # chunk of a page in a single call.
+    queue = []  # per page: [url, [(chunk, fuzz), ...], next index to check]
+    for pg in pages:
+        if not pg["text"]:
+            continue
+        pg_chunks = windows(sents(pg["text"]))
+        if not pg_chunks:
+            continue
+        scores = process.cdist([doc], pg_chunks, scorer=fuzz.token_set_ratio,
+                               dtype=np.float64, workers=-1)[0]
+        queue.append([pg["url"], [(ch, float(sc)) for ch, sc in zip(pg_chunks, scores)], 0])
+
+    # Cosine stage: each round embeds just enough fuzz-passing chunks to fill
+    # every page's MAX_OVERL_URL quota and scores them with one matmul, so no
+    # more chunks get embedded than the one-by-one loop would have.
+    found = {entry[0]: [] for entry in queue}
+    word_overlap = 0
+    while queue:
+        batch = []
+        for entry in queue:
+            url, scored, pos = entry
+            need = MAX_OVERL_URL - len(found[url])
+            while pos < len(scored) and need:
+                ch, fuzz_sc = scored[pos]
+                pos += 1
+                if fuzz_sc >= TH_FUZZ:
+                    batch.append((url, ch, fuzz_sc))
+                    need -= 1
+            entry[2] = pos
+        if not batch:
+            break
+        if doc_mat is not None:
+            cos_all = (_unit_rows(embed_many([ch[:500] for _, ch, _ in batch])) @ doc_mat.T).max(axis=1)
+        else:
+            cos_all = np.zeros(len(batch))
+        for (url, ch, fuzz_sc), cos_sc in zip(batch, cos_all):
+            if cos_sc >= TH_COS:
+                found[url].append((ch[:180]+"…", fuzz_sc, round(float(cos_sc), 2), url))
+                word_overlap += len(ch.split())
+        queue = [e for e in queue if e[2] < len(e[1]) and len(found[e[0]]) < MAX_OVERL_URL]
+
+    overlaps = [o for url_overlaps in found.values() for o in url_overlaps]
+    orig = max(0, 100 - word_overlap/max(1, len(doc.split()))*100)
+    return orig, sorted(overlaps, key=lambda x: (-x[1], -x[2]))
+
+# ─────────── PDF builder (Standard, no visualization) ───────────
+def pdf_report(doc_text, orig, ai, reason, queries, hits, cites):
+    stats = doc_stats(doc_text)
+    story = [
+        Paragraph("Executive Summary", H2),
+        Paragraph(f"Word count: {stats['words']}, "
+                  f"Sentences: {stats['sentences']}, "
+                  f"Avg sentence length: {stats['avg_sent_len']} words.", S),
+        Paragraph(f"Originality score: <b>{orig:.1f}%</b>", S),
+        Paragraph(f"AI probability: <b>{ai:.1f}%</b> — {reason}", S),
+        Spacer(1, 12)
+    ]
+
+    story.append(Paragraph("Top Keywords", H3))
+    
+    kw_header_row = [Paragraph('<b>Keyword</b>', S), Paragraph('<b>Freq</b>', S)]
+    kw_data_rows = []
+    for k_word, freq_val in top_keywords(doc_text, 15):
+        kw_data_rows.append([Paragraph(k_word, S), Paragraph(str(freq_val), S)])
+    kw_table_data = [kw_header_row] + kw_data_rows
+    
+    kw_table_style = TableStyle([
+        ("GRID",       (0, 0), (-1, -1), 0.25, colors.grey),
+        ("BACKGROUND", (0, 0), (-1, 0),  colors.whitesmoke),
+        ("ALIGN",      (1, 0), (-1, -1), "CENTER"),
+        ("VALIGN",     (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING",(0, 0), (-1, -1), 4),
+        ("RIGHTPADDING",(0, 0), (-1, -1), 4),
+        ("TOPPADDING", (0,0), (-1,-1), 3),
+        ("BOTTOMPADDING", (0,0), (-1,-1), 3),
+    ])
+    kw_table = Table(kw_table_data, colWidths=[200, 50], style=kw_table_style)
+    story.extend([kw_table, Spacer(1, 12)])
+
+    story += [Paragraph("Queries Generated", H3)]
+    story.extend(Paragraph(q, S) for q in queries)
+    story.append(Spacer(1, 12))
+
+    if hits:
+        story.append(Paragraph("Top Search Results", H3))
+        
+        search_results_header_row = [
+            Paragraph('<b>Title</b>', S),
+            Paragraph('<b>URL</b>', S),
+            Paragraph('<b>Snippet</b>', S)
+        ]
+        search_results_data_rows = []
+        for h_item in hits[:12]:
+            title_text = h_item.get("title", "")
+            url_text = h_item.get("url", "")
+            snippet_text = (h_item.get("snippet", "")[:70] + "…") if h_item.get("snippet") else ""
+            search_results_data_rows.append([
+                Paragraph(title_text, S),
+                Paragraph(url_text, S),
+                Paragraph(snippet_text, S)
+            ])
+        
+        search_results_table_data = [search_results_header_row] + search_results_data_rows
+        
+        search_results_table_style = TableStyle([
+            ("GRID", (0,0), (-1,-1), 0.25, colors.grey),
+            ("VALIGN", (0,0), (-1,-1), "TOP"),
+            ("LEFTPADDING", (0,0), (-1,-1), 3),
+            ("RIGHTPADDING", (0,0), (-1,-1), 3),
+            ("TOPPADDING", (0,0), (-1,-1), 3),
+            ("BOTTOMPADDING", (0,0), (-1,-1), 3),
+            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
+        ])
+        
+        search_results_table = Table(search_results_table_data, colWidths=[140, 180, 200], style=search_results_table_style)
+        story.append(search_results_table)
+        story.append(Spacer(1, 12))
+
+    if cites:
+        story.append(Paragraph("Detected Overlaps", H3))
+        for sn, fs, cs, u in cites:
+            story += [Paragraph(f"[Fuzz {fs} / Cos {cs}] "
+                                f"<i>{sn}</i><br/><a href='{u}'>{u}</a>", S),
+                      Spacer(1, 6)]
+    else:
+        story.append(Paragraph("No overlaps detected above thresholds.", S))
+
+    story += [
+        PageBreak(),
+        Paragraph("Methodology", H2),
+        Paragraph(textwrap.dedent(f"""
+            • Generated {len(queries)} keyword queries (title + TF-IDF terms).
+            • Serper API retrieved {len(hits)} pages (max {MAX_PAGES}).
+            • Each page scraped (BeautifulSoup) and token-cleaned.
+            • Comparison window: {WINDOW_SENT} sentences.
+            • Overlap when RapidFuzz ≥ {TH_FUZZ}% **or** cosine ≥ {TH_COS}.  
+            • Originality = 100 − overlapped-word ratio.
+            • AI Probability assessed using Google Gemini.
+        """), S)
+    ]
+
+    buf = io.BytesIO()
+    doc_template = SimpleDocTemplate(buf)
+    doc_template.build(story)
+    buf.seek(0)
+    return buf.getvalue()
+
+# ─────────── main analyse function for external use ───────────
+def tuning_knobs() -> Dict[str, Any]:
+    """Settings that change the outcome of an analysis (part of the result cache key)."""
+    return {"MAX_QUERIES": MAX_QUERIES, "MAX_PAGES": MAX_PAGES, "WINDOW_SENT": WINDOW_SENT,
+            "TH_FUZZ": TH_FUZZ, "TH_COS": TH_COS, "MAX_OVERL_URL": MAX_OVERL_URL,
+            "EMBED_MODEL": EMBED_MODEL}
+
+def result_cache_stats() -> Dict[str, Any]:
+    return _results.stats()
+
+def _stage_runner(progress: Optional[Callable[[str], None]], run: metrics.RunMetrics):
+    @contextmanager
+    def stage(name):
+        if progress:
+            progress(name)
+        with run.stage(name):
+            yield
+    return stage
+
+def analyse(main_txt: Optional[str] = None, main_file: Optional[Dict[str, str]] = None,
+            comparison_txt: Optional[str] = None, comparison_file: Optional[Dict[str, str]] = None,
+            progress: Optional[Callable[[str], None]] = None,
+            run_metrics: Optional[metrics.RunMetrics] = None) \
+            -> Tuple[str, float, float, Optional[str]]:
+    # `progress`, if given, is called with the name of each stage as it starts:
+    # extract, search, plagiarism, ai, report. `run_metrics`, if given,
+    # receives per-stage wall time and counters (API calls, cache hits, bytes).
+    run = run_metrics or metrics.RunMetrics()
+    with metrics.collecting(run):
+        result, pdf = _analyse(main_txt, main_file, _stage_runner(progress, run))
+    if DEBUG: print(f"Analysis metrics: {run.snapshot()}")
+    if result is None:
+        return "Provide text", 0, 0, None
+
+    pdf_path = None
+    if pdf: # Ensure PDF content is generated before saving
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+            tmp.write(pdf)
+            pdf_path = tmp.name
+    
+    return result["cite_txt"], result["orig"], result["ai"], pdf_path
+
+def _analyse(main_txt, main_file, stage):
+    with stage("extract"):
+        if main_file:
+            streamed = StreamedDoc(iter_text_file(main_file['name']))
+        else:
+            streamed = StreamedDoc([main_txt or ""])
+    doc_text = streamed.text
+    if not doc_text:
+        return None, None
+    metrics.incr("document_words", len(doc_text.split()))
+    
+    # NOTE: `comparison_txt` / `comparison_file` are accepted but not used here;
+    # the result reflects web-based plagiarism and AI detection only.
+    # Submissions are compared with each other in cohort mode (analyse_cohort).
+
+    def compute():
+        with stage("search"):
+            hits, queries = run_search(doc_text)
+        with stage("plagiarism"):
+            orig, cites = plagiarism(doc_text, hits, streamed)
+        with stage("ai"):
+            ai, reason = detect_ai(doc_text)
+        with stage("report"):
+            pdf = pdf_report(doc_text, orig, ai, reason, queries, hits, cites)
+        cite_txt = "\n".join(f"[F{fs}/C{cs}] {u}" for _, fs, cs, u in cites) or "No overlaps."
+        # Don't let a failed API call be served from the cache for a whole TTL.
+        partial = reason == AI_ERROR_REASON or bool(SERPER_API_KEY and not hits)
+        return {"cite_txt": cite_txt, "orig": orig, "ai": ai, "partial": partial}, pdf
+
+    # Resubmissions of the same text are answered from the result cache, and
+    # identical requests in flight at the same time share one computation.
+    computed = []
+    result, pdf = _results.get_or_compute(result_key(doc_text, tuning_knobs()),
+                                          lambda: computed.append(True) or compute())
+    metrics.incr("result_cache_misses" if computed else "result_cache_hits")
+    return result, pdf
+
+# ─────────── cohort mode: submissions against each other ───────────
+def create_cohort(owner: str, name: str) -> str:
+    return _cohorts.create(owner, name)
+
+def delete_cohort(cohort_id: str):
+    _cohorts.delete(cohort_id)
+
+def get_cohort(cohort_id: str) -> Optional[Dict[str, Any]]:
+    return _cohorts.get(cohort_id)
+
+def cohort_report(cohort_id: str) -> Dict[str, Any]:
+    return _cohorts.report(cohort_id)
+
+def _confirm_pairs(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int, float, float]]:
+    """Scores LSH candidate window pairs like plagiarism() scores web chunks:
+    a pair is a match when both fuzz ≥ TH_FUZZ and cosine ≥ TH_COS."""
+    texts = _cohorts.window_texts({w for pair in pairs for w in pair})
+    passed = [(a, b, float(fuzz.token_set_ratio(texts[a], texts[b]))) for a, b in pairs]
+    passed = [p for p in passed if p[2] >= TH_FUZZ]
+    if not passed:
+        return []
+    ids = list(dict.fromkeys(w for a, b, _ in passed for w in (a, b)))
+    row = {w: i for i, w in enumerate(ids)}
+    mat = _unit_rows(embed_many([texts[w][:500] for w in ids]))
+    cos_all = np.einsum("ij,ij->i", mat[[row[a] for a, _, _ in passed]], mat[[row[b] for _, b, _ in passed]])
+    return [(a, b, round(fs, 1), round(float(c), 2)) for (a, b, fs), c in zip(passed, cos_all) if c >= TH_COS]
+
+def analyse_cohort(cohort_id: str, documents: List[Dict[str, str]],
+                   progress: Optional[Callable[[str], None]] = None,
+                   run_metrics: Optional[metrics.RunMetrics] = None) -> List[int]:
+    # Adds `documents` ({"name", "text"} or {"name", "file"}) to the cohort and
+    # checks them against each other and everything indexed before. Stages:
+    # extract, index, compare. Returns the ids of the documents added; the
+    # report for the whole cohort comes from cohort_report().
+    run = run_metrics or metrics.RunMetrics()
+    stage = _stage_runner(progress, run)
+    added = []
+    with metrics.collecting(run):
+        with stage("extract"):
+            texts = [(d["name"], extract_text_file(d["file"]) if d.get("file") else (d.get("text") or ""))
+                     for d in documents]
+        try:
+            with stage("index"):
+                prepared = []
+                for name, text in texts:
+                    ss = sents(text)
+                    chunks = windows(ss) or ([" ".join(ss)] if ss else [])
+                    prepared.append((name, len(text.split()), chunks))
+                    metrics.incr("cohort_windows", len(chunks))
+                added, candidates = _cohorts.add_documents(cohort_id, prepared)
+                metrics.incr("cohort_documents", len(added))
+                metrics.incr("cohort_candidates", len(candidates))
+            with stage("compare"):
+                matches = _confirm_pairs(candidates) if candidates else []
+                _cohorts.add_matches(cohort_id, matches)
+                metrics.incr("cohort_matches", len(matches))
+        except Exception:
+            # Unscored documents would never be compared again; drop them so
+            # the submission can simply be retried.
+            _cohorts.remove_documents(added)
+            raise
+    return added
@@ -0,0 +1,294 @@
+# backend/database.py
+import pymongo
+from bson.objectid import ObjectId
+from flask_login import UserMixin
+from config import Config
+from datetime import datetime
+from flask_bcrypt import Bcrypt
+import base64
+import threading
+import time
+
+bcrypt = Bcrypt()
+
+USER_CACHE_TTL = 60        # seconds a loaded user is reused by the login loader
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+# Fields returned by the history API; user_id is implied by the query.
+REPORT_LIST_FIELDS = {"file_name": 1, "originality_score": 1, "ai_probability": 1,
+                      "pdf_report_path": 1, "submission_date": 1}
+
+class DB:
+    client = None
+    db = None
+
+    @staticmethod
+    def initialize():
+        if DB.client is None:
+            try:
+                DB.client = pymongo.MongoClient(Config.MONGO_URI)
+                DB.db = DB.client.get_database()
+                if DB.db is None:
+                    raise Exception("MongoDB URI did not specify a database name, or get_database() returned None.")
+                print("✅ MongoDB connected successfully!") # Changed print for clarity
+                DB.ensure_indexes()
+            except pymongo.errors.ConnectionFailure as e:
+                print(f"❌ Could not connect to MongoDB: {e}") # Changed print for clarity
+                DB.client = None
+                DB.db = None
+            except Exception as e:
+                print(f"❌ An unexpected error occurred during MongoDB connection: {e}") # Changed print for clarity
+                DB.client = None
+                DB.db = None
+
+    @staticmethod
+    def ensure_indexes():
+        # History pages are keyset scans over (user_id, submission_date, _id).
+        try:
+            DB.db['reports'].create_index(
+                [("user_id", pymongo.ASCENDING), ("submission_date", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+                name="user_history")
+        except Exception as e:
+            print(f"WARNING: Could not create reports index: {e}")
+        try:
+            DB.db['users'].create_index([("email", pymongo.ASCENDING)], unique=True, name="email_unique")
+        except Exception as e:
+            print(f"WARNING: Could not create users.email index (duplicate emails?): {e}")
+
+    @staticmethod
+    def get_collection(collection_name):
+        if DB.db is None:
+            DB.initialize()
+            if DB.db is None:
+                print(f"WARNING: Could not retrieve collection '{collection_name}' because MongoDB connection failed.")
+                return None
+        return DB.db[collection_name]
+
+_user_cache = {}  # user_id -> (expires_at, User)
+_user_cache_lock = threading.Lock()
+
+class User(UserMixin):
+    def __init__(self, user_data):
+        self.user_data = user_data
+        self._id = user_data.get('_id')
+        self.id = str(self._id)
+
+    def get_id(self):
+        return self.id
+
+    def get_email(self):
+        return self.user_data.get('email')
+
+    def get_name(self):
+        return self.user_data.get('name')
+    
+    def get_profile_pic(self):
+        return self.user_data.get('profile_pic', 'https://via.placeholder.com/32')
+
+    @staticmethod
+    def get(user_id):
+        # Called by the login loader on every authenticated request, so recent
+        # lookups are served from a short-lived in-process cache.
+        now = time.monotonic()
+        with _user_cache_lock:
+            cached = _user_cache.get(user_id)
+            if cached and cached[0] > now:
+                return cached[1]
+        users_collection = DB.get_collection('users')
+        if users_collection is None:
+            return None
+        try:
+            user_doc = users_collection.find_one({"_id": ObjectId(user_id)})
+            if user_doc:
+                user = User(user_doc)
+                with _user_cache_lock:
+                    _user_cache[user_id] = (now + USER_CACHE_TTL, user)
+                    if len(_user_cache) > 10_000:
+                        for key, (expires_at, _) in list(_user_cache.items()):
+                            if expires_at <= now:
+                                del _user_cache[key]
+                return user
+        except Exception as e:
+            print(f"Error retrieving user by ID {user_id}: {e}")
+        return None
+
+    @staticmethod
+    def get_by_email(email):
+        users_collection = DB.get_collection('users')
+        if users_collection is None:
+            return None
+        try:
+            user_doc = users_collection.find_one({"email": email})
+            if user_doc:
+                return User(user_doc)
+        except Exception as e:
+            print(f"Error retrieving user by email {email}: {e}")
+        return None
+
+    @staticmethod
+    def create_user(email, password, name):
+        users_collection = DB.get_collection('users')
+        if users_collection is None:
+            return None
+        
+        if users_collection.find_one({"email": email}):
+            raise ValueError("User with this email already exists.")
+
+        try:
+            hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+            new_user_data = {
+                "email": email,
+                "password": hashed_password,
+                "name": name,
+                "profile_pic": 'https://via.placeholder.com/32',
+                "created_at": datetime.utcnow(),
+                "last_login": datetime.utcnow()
+            }
+            result = users_collection.insert_one(new_user_data)
+            new_user_data['_id'] = result.inserted_id
+            return User(new_user_data)
+        except Exception as e:
+            print(f"Error creating user {email}: {e}")
+            raise
+        return None
+    
+    def check_password(self, password):
+        # Ensure 'password' key exists before attempting to check hash
+        if 'password' not in self.user_data:
+            return False # User object from DB doesn't have a password field
+        return bcrypt.check_password_hash(self.user_data['password'], password)
+
+def _format_report(report):
+    report['_id'] = str(report['_id'])
+    if 'user_id' in report:
+        report['user_id'] = str(report['user_id'])
+    report['submission_date'] = report['submission_date'].isoformat() + "Z" # ISO format for JS Date parsing
+    return report
+
+def encode_history_cursor(submission_date, report_id):
+    raw = f"{submission_date.isoformat()}|{report_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_history_cursor(cursor):
+    """Returns (submission_date, ObjectId); raises ValueError for a malformed cursor."""
+    try:
+        date_part, id_part = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(date_part), ObjectId(id_part)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+# NEW: Report management functions
+class Report:
+    @staticmethod
+    def save_report_metadata(user_id, file_name, originality, ai_probability, pdf_path):
+        reports_collection = DB.get_collection('reports')
+        if reports_collection is None:
+            return None
+        
+        report_data = {
+            "user_id": ObjectId(user_id),
+            "file_name": file_name,
+            "originality_score": originality,
+            "ai_probability": ai_probability,
+            "pdf_report_path": pdf_path,
+            "submission_date": datetime.utcnow(),
+            "in_user_stats": True  # counted by _record_stats, not by the backfill
+        }
+        try:
+            result = reports_collection.insert_one(report_data)
+            print(f"Report saved for user {user_id}: {file_name}")
+            Report._record_stats(user_id, report_data)
+            return str(result.inserted_id)
+        except Exception as e:
+            print(f"Error saving report metadata for user {user_id}: {e}")
+            return None
+
+    @staticmethod
+    def _record_stats(user_id, report_data):
+        """Keeps the per-user dashboard counters in user_stats up to date.
+        Every report saved here adds itself with one $inc; reports from before
+        the counters existed are added once by _backfill_stats."""
+        stats_collection = DB.get_collection('user_stats')
+        if stats_collection is None:
+            return
+        last_report = {k: v for k, v in report_data.items() if k not in ("user_id", "in_user_stats")}
+        try:
+            stats_collection.update_one({"_id": ObjectId(user_id)}, {"$inc": {"total_reports": 1}}, upsert=True)
+            Report._advance_last_report(user_id, last_report)
+            Report._backfill_stats(user_id)
+        except Exception as e:
+            print(f"Error updating report stats for user {user_id}: {e}")
+
+    @staticmethod
+    def _advance_last_report(user_id, last_report):
+        # Only move last_report forward, in case two saves race.
+        DB.get_collection('user_stats').update_one(
+            {"_id": ObjectId(user_id),
+             "$or": [{"last_report": None},
+                     {"last_report.submission_date": {"$lte": last_report["submission_date"]}}]},
+            {"$set": {"last_report": last_report}})
+
+    @staticmethod
+    def _backfill_stats(user_id):
+        """Adds the user's reports saved before the counters existed, once."""
+        reports_collection = DB.get_collection('reports')
+        stats_collection = DB.get_collection('user_stats')
+        stats = stats_collection.find_one({"_id": ObjectId(user_id)}, {"backfilled": 1})
+        if stats and stats.get("backfilled"):
+            return
+        stats_collection.update_one({"_id": ObjectId(user_id)}, {"$setOnInsert": {"total_reports": 0}}, upsert=True)
+        # New reports carry in_user_stats, so this set no longer grows and the
+        # guarded update below adds it exactly once, whoever gets there first.
+        older = {"user_id": ObjectId(user_id), "in_user_stats": {"$exists": False}}
+        total = reports_collection.count_documents(older)
+        result = stats_collection.update_one({"_id": ObjectId(user_id), "backfilled": {"$ne": True}},
+                                             {"$inc": {"total_reports": total}, "$set": {"backfilled": True}})
+        last_report = reports_collection.find_one(older, {"user_id": 0},
+                                                  sort=[("submission_date", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+        if result.modified_count and last_report:
+            Report._advance_last_report(user_id, last_report)
+
+    @staticmethod
+    def get_user_stats(user_id):
+        """Returns (total_reports, last_report) from the user_stats counters,
+        building them from the reports collection the first time."""
+        stats_collection = DB.get_collection('user_stats')
+        if stats_collection is None:
+            return 0, None
+        try:
+            stats = stats_collection.find_one({"_id": ObjectId(user_id)})
+            if stats is None or not stats.get("backfilled"):
+                Report._backfill_stats(user_id)
+                stats = stats_collection.find_one({"_id": ObjectId(user_id)})
+            last_report = stats.get("last_report")
+            return stats.get("total_reports", 0), _format_report(dict(last_report)) if last_report else None
+        except Exception as e:
+            print(f"Error retrieving report stats for user {user_id}: {e}")
+            return 0, None
+
+    @staticmethod
+    def get_user_reports(user_id, limit=HISTORY_PAGE_SIZE, cursor=None):
+        """Returns one page of a user's reports, newest first, and the cursor
+        for the next page (None on the last page). Raises ValueError for a
+        malformed cursor."""
+        reports_collection = DB.get_collection('reports')
+        if reports_collection is None:
+            return [], None
+        limit = max(1, min(int(limit), HISTORY_MAX_PAGE_SIZE))
+        query = {"user_id": ObjectId(user_id)}
+        if cursor:
+            before_date, before_id = decode_history_cursor(cursor)
+            query["$or"] = [{"submission_date": {"$lt": before_date}},
+                            {"submission_date": before_date, "_id": {"$lt": before_id}}]
+        try:
+            page = list(reports_collection.find(query, REPORT_LIST_FIELDS)
+                        .sort([("submission_date", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+                        .limit(limit + 1))
+            next_cursor = None
+            if len(page) > limit:
+                page = page[:limit]
+                next_cursor = encode_history_cursor(page[-1]['submission_date'], page[-1]['_id'])
+            return [_format_report(report) for report in page], next_cursor
+        except Exception as e:
+            print(f"Error retrieving reports for user {user_id}: {e}")
+            return [], None
@@ -0,0 +1,100 @@
+# backend/embed_store.py
+"""
+Content-addressed cache for embedding vectors.
+
+Vectors are keyed by a SHA-256 of (model, text). A bounded in-memory LRU
+tier sits in front of a SQLite file, so entries survive restarts and are
+shared between every worker process that points at the same file.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_SQL_CHUNK = 500  # stay well below SQLite's bound-parameter limit
+
+
+class EmbeddingStore:
+    def __init__(self, path: str, model: str, max_items: int = 50_000):
+        self.path = path
+        self.model = model
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._mem: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vec BLOB NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vec: np.ndarray):
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Looks texts up in memory, then on disk. Missing entries are None."""
+        keys = [self.key(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for k in keys:
+                if k in self._mem:
+                    self._mem.move_to_end(k)
+                    found[k] = self._mem[k]
+
+        cold = list(dict.fromkeys(k for k in keys if k not in found))
+        for i in range(0, len(cold), _SQL_CHUNK):
+            part = cold[i:i + _SQL_CHUNK]
+            rows = self._conn().execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            for k, blob in rows:
+                found[k] = np.frombuffer(blob, dtype=np.float32)
+        if cold:
+            with self._lock:
+                for k in cold:
+                    if k in found:
+                        self._remember(k, found[k])
+
+        out = [found.get(k) for k in keys]
+        with self._lock:
+            hit = sum(v is not None for v in out)
+            self.hits += hit
+            self.misses += len(out) - hit
+        return out
+
+    def put_many(self, items: Dict[str, Sequence[float]]):
+        rows = []
+        with self._lock:
+            for text, vec in items.items():
+                v = np.asarray(vec, dtype=np.float32)
+                k = self.key(text)
+                self._remember(k, v)
+                rows.append((k, v.size, v.tobytes()))
+        if rows:
+            self._conn().executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vec) VALUES (?, ?, ?)", rows
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_items": len(self._mem)}
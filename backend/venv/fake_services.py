@@ -0,0 +1,217 @@
+# backend/fake_services.py
+"""
+Local stand-in for the Gemini and Serper APIs and for the web pages they
+point at, for throughput testing and offline benchmarks.
+
+    python fake_services.py --port 8765 --latency 0.2 --gemini-rps 5
+
+then start the backend with the variables it prints. Each API can be given
+a latency and a rate limit; requests above the limit get a 429, so the
+client-side backoff can be exercised. Pages are served from --fixtures
+(*.html) when given, otherwise generated.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+
+EMBED_DIM = 768
+_WORDS = ("method system result analysis model data network training accuracy "
+          "evaluation feature approach baseline experiment signal error").split()
+
+
+class TokenBucket:
+    """Server-side rate limit: requests that find the bucket empty get a 429."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+
+def fake_vector(text: str) -> List[float]:
+    """Deterministic unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    v = np.random.default_rng(seed).standard_normal(EMBED_DIM)
+    return (v / np.linalg.norm(v)).round(6).tolist()
+
+
+class FakeServices:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 page_latency: float = 0.0, gemini_rps: Optional[float] = None,
+                 serper_rps: Optional[float] = None, fixtures: Optional[str] = None,
+                 hits_per_query: int = 10):
+        self.latency = latency
+        self.page_latency = page_latency
+        self.hits_per_query = hits_per_query
+        self.limits = {"gemini": TokenBucket(gemini_rps, gemini_rps) if gemini_rps else None,
+                       "serper": TokenBucket(serper_rps, serper_rps) if serper_rps else None}
+        self.pages: Dict[str, str] = {}
+        if fixtures:
+            for name in sorted(os.listdir(fixtures)):
+                if name.endswith(".html"):
+                    with open(os.path.join(fixtures, name), encoding="utf-8") as f:
+                        self.pages[name[:-5]] = f.read()
+        self.counts: Dict[str, int] = {}
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        return {"SERPER_URL": f"{self.url}/search", "SERPER_API_KEY": "fake",
+                "GEMINI_API_ENDPOINT": self.url, "GOOGLE_API_KEY": "fake"}
+
+    def start(self) -> "FakeServices":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, name: str, nbytes: int = 0):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.bytes_served += nbytes
+
+    # ─────────── responses ───────────
+    def search(self, q: str) -> dict:
+        names = sorted(self.pages) or [f"gen-{i}" for i in range(50)]
+        start = int(hashlib.sha256(q.encode()).hexdigest(), 16) % len(names)
+        picked = [names[(start + i) % len(names)] for i in range(min(self.hits_per_query, len(names)))]
+        return {"organic": [{"link": f"{self.url}/page/{n}", "title": f"Result {n}",
+                             "snippet": f"Snippet for {q}"} for n in picked]}
+
+    def page(self, name: str) -> str:
+        if name in self.pages:
+            return self.pages[name]
+        seed = int(hashlib.sha256(name.encode()).hexdigest(), 16)
+        words = [_WORDS[(seed >> i) % len(_WORDS)] for i in range(0, 400)]
+        sentences = [" ".join(words[i:i + 12]).capitalize() + "." for i in range(0, len(words), 12)]
+        return f"<html><body><script>var x=1;</script><p>{' '.join(sentences)}</p></body></html>"
+
+    @staticmethod
+    def generate(prompt: str) -> str:
+        if "AI-generated" in prompt:
+            return "42% – Fake detector: uniform sentence structure."
+        topic = " ".join(re.findall(r"[A-Za-z]{5,}", prompt)[-12:]) or "document"
+        return "\n".join(f"{topic} query {i}" for i in range(1, 6))
+
+    def _handler(self):
+        svc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, ctype: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _limited(self, api: str) -> bool:
+                bucket = svc.limits.get(api)
+                if bucket and not bucket.try_acquire():
+                    svc._count(f"{api}_429")
+                    self._send(429, b'{"error": {"code": 429, "message": "rate limited", "status": "RESOURCE_EXHAUSTED"}}')
+                    return True
+                return False
+
+            def do_GET(self):
+                m = re.match(r"^/page/([\w.-]+)$", self.path)
+                if not m:
+                    return self._send(404, b"{}")
+                time.sleep(svc.page_latency)
+                body = svc.page(m.group(1)).encode("utf-8")
+                svc._count("page", len(body))
+                self._send(200, body, "text/html; charset=utf-8")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?")[0]
+                api = "serper" if path == "/search" else "gemini"
+                if self._limited(api):
+                    return
+                time.sleep(svc.latency)
+                if path == "/search":
+                    out = svc.search(payload.get("q", ""))
+                elif path.endswith(":batchEmbedContents"):
+                    out = {"embeddings": [{"values": fake_vector(" ".join(p.get("text", "") for p in r["content"]["parts"]))}
+                                          for r in payload.get("requests", [])]}
+                elif path.endswith(":embedContent"):
+                    out = {"embedding": {"values": fake_vector(" ".join(p.get("text", "") for p in payload["content"]["parts"]))}}
+                elif path.endswith(":generateContent"):
+                    prompt = " ".join(p.get("text", "") for c in payload.get("contents", []) for p in c.get("parts", []))
+                    out = {"candidates": [{"content": {"parts": [{"text": svc.generate(prompt)}], "role": "model"},
+                                           "finishReason": "STOP", "index": 0}]}
+                else:
+                    return self._send(404, b"{}")
+                body = json.dumps(out).encode("utf-8")
+                svc._count(path.rsplit(":", 1)[-1].strip("/"), len(body))
+                self._send(200, body)
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to each API call")
+    ap.add_argument("--page-latency", type=float, default=0.0, help="seconds added to each page fetch")
+    ap.add_argument("--gemini-rps", type=float, help="requests/s before Gemini answers 429")
+    ap.add_argument("--serper-rps", type=float, help="requests/s before Serper answers 429")
+    ap.add_argument("--fixtures", help="directory of *.html pages to serve")
+    args = ap.parse_args()
+
+    svc = FakeServices(args.host, args.port, args.latency, args.page_latency,
+                       args.gemini_rps, args.serper_rps, args.fixtures)
+    for k, v in svc.env().items():
+        print(f"{k}={v}")
+    print("Serving; Ctrl+C prints request counts.")
+    try:
+        svc.server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(svc.counts, indent=2), f"\nbytes served: {svc.bytes_served}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# backend/jobs.py
+"""
+Background analysis jobs.
+
+POST /analyse (and the cohort endpoints) only record a job and hand it to a
+pool of worker processes; clients poll GET /jobs/<id>. Workers report per-stage progress back over a
+queue; the web process records it in a small SQLite file, so any Flask
+process on the host can answer a status request. Workers are spawned rather
+than forked: the web process is threaded, and a fork could copy a lock or a
+SQLite handle that another thread was holding at the time.
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "20"))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(tempfile.gettempdir(), "plagiarism_jobs.sqlite3"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 86400)))  # seconds a finished job stays pollable
+
+STAGES = ["extract", "search", "plagiarism", "ai", "report"]
+COHORT_STAGES = ["extract", "index", "compare"]
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobStore:
+    def __init__(self, path: str = JOB_DB_PATH, retention: float = JOB_RETENTION):
+        self.path = path
+        self.retention = retention
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, user_id TEXT, file_name TEXT, owner_pid INTEGER,"
+                " status TEXT, stage TEXT, stages TEXT, result TEXT, error TEXT,"
+                " created_at REAL, updated_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _update(self, job_id: str, only_active: bool = False, **fields):
+        fields["updated_at"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        where = " AND status IN ('queued', 'running')" if only_active else ""
+        with self._conn() as conn:
+            conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?{where}", [*fields.values(), job_id])
+
+    def create(self, user_id: str, file_name: str, stages: List[str] = STAGES) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._conn() as conn:
+            # Finished jobs keep their whole result; drop the ones past retention.
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                         (now - self.retention,))
+            conn.execute(
+                "INSERT INTO jobs (id, user_id, file_name, owner_pid, status, stage, stages,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', NULL, ?, ?, ?)",
+                (job_id, user_id, file_name, os.getpid(),
+                 json.dumps({s: "pending" for s in stages}), now, now),
+            )
+        return job_id
+
+    def _stage_names(self, job_id: str) -> List[str]:
+        with self._conn() as conn:
+            row = conn.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return list(json.loads(row["stages"])) if row else []
+
+    def start_stage(self, job_id: str, stage: str):
+        names = self._stage_names(job_id)
+        current = names.index(stage)
+        stages = {s: "done" if i < current else "pending" for i, s in enumerate(names)}
+        stages[stage] = "running"
+        # A late progress message must not reopen a job that already ended.
+        self._update(job_id, only_active=True, status="running", stage=stage, stages=json.dumps(stages))
+
+    def finish(self, job_id: str, result: Dict[str, Any]):
+        self._update(job_id, status="done", stage=None, result=json.dumps(result),
+                     stages=json.dumps({s: "done" for s in self._stage_names(job_id)}))
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, status="failed", error=error)
+
+    def delete(self, job_id: str):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._conn() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["stages"] = json.loads(job["stages"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        done = sum(1 for state in job["stages"].values() if state == "done")
+        job["progress"] = round(100 * done / max(1, len(job["stages"])))
+        return job
+
+    def fail_orphans(self):
+        """Marks unfinished jobs whose owning process is gone as failed."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT id, owner_pid FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        for row in rows:
+            try:
+                os.kill(row["owner_pid"], 0)
+            except OSError:
+                self.fail(row["id"], "Interrupted by a server restart.")
+
+
+_progress_queue = None
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _run_job(job_id: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Executes one analysis inside a worker process."""
+    from core_detector import analyse
+
+    run = metrics.RunMetrics()
+    cite_txt, originality_score, ai_probability, pdf_report_path = analyse(
+        **kwargs, progress=lambda stage: _progress_queue.put((job_id, stage)), run_metrics=run)
+    return {
+        "citations": cite_txt.split('\n') if cite_txt != "No overlaps." else ["No overlaps."],
+        "originality": originality_score,
+        "aiProbability": ai_probability,
+        "pdfReportPath": pdf_report_path,
+        "metrics": run.snapshot(),
+    }
+
+
+def _run_cohort_job(job_id: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Executes one cohort check inside a worker process."""
+    from core_detector import analyse_cohort
+
+    run = metrics.RunMetrics()
+    added = analyse_cohort(**kwargs, progress=lambda stage: _progress_queue.put((job_id, stage)), run_metrics=run)
+    # The cohort report can be large and changes as documents are added, so
+    # the job only points at it: clients fetch GET /api/cohorts/<id>.
+    return {"cohortId": kwargs["cohort_id"], "added": added, "metrics": run.snapshot()}
+
+
+# kind -> (worker function, stages)
+TASKS = {"analyse": (_run_job, STAGES), "cohort": (_run_cohort_job, COHORT_STAGES)}
+
+
+class JobQueue:
+    def __init__(self, on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+                 workers: int = JOB_WORKERS, max_pending: int = JOB_QUEUE_DEPTH,
+                 db_path: str = JOB_DB_PATH):
+        self.store = JobStore(db_path)
+        self.store.fail_orphans()
+        self.on_complete = on_complete
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app never starts processes.
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            self._progress_queue = context.Queue()
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                             initializer=_init_worker, initargs=(self._progress_queue,))
+            threading.Thread(target=self._record_progress, args=(self._progress_queue,), daemon=True).start()
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Drops a pool that lost a worker (out of memory, a native crash):
+        such a pool refuses all further work, so the next submit builds a new
+        one. Caller holds self._lock."""
+        if pool is not None and pool is self._pool:
+            print("A job worker died; starting a new worker pool.")
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._progress_queue.put(None)  # stops that pool's progress recorder
+
+    def _record_progress(self, progress_queue):
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                return
+            job_id, stage = item
+            try:
+                self.store.start_stage(job_id, stage)
+            except Exception as e:
+                print(f"Could not record progress for job {job_id}: {e}")
+
+    def submit(self, user_id: str, file_name: str, kwargs: Dict[str, Any],
+               cleanup_paths: List[str] = (), kind: str = "analyse") -> str:
+        """Queues an analyse() call, or an analyse_cohort() call for kind
+        "cohort". Files in cleanup_paths are removed once it ends."""
+        task, stages = TASKS[kind]
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"Too many analyses in progress ({self.max_pending}). Please retry shortly.")
+            job_id = self.store.create(user_id, file_name, stages)
+            try:
+                pool = self._executor()
+                try:
+                    future = pool.submit(task, job_id, kwargs)
+                except BrokenProcessPool:
+                    self._discard_pool(pool)
+                    pool = self._executor()
+                    future = pool.submit(task, job_id, kwargs)
+            except Exception:
+                self.store.delete(job_id)
+                raise
+            self._pending += 1
+        future.add_done_callback(lambda f: self._complete(job_id, f, pool, cleanup_paths, kind))
+        return job_id
+
+    def _complete(self, job_id: str, future: Future, pool: ProcessPoolExecutor, cleanup_paths, kind):
+        # on_complete and the /metrics totals cover analyses only.
+        try:
+            result = future.result()
+            if kind == "analyse" and self.on_complete:
+                self.on_complete(self.store.get(job_id), result)
+            self.store.finish(job_id, result)
+            if kind == "analyse":
+                metrics.registry.observe("done", result.get("metrics"))
+        except BrokenProcessPool:
+            print(f"Analysis job {job_id} failed: its worker process died")
+            self.store.fail(job_id, "The analysis worker stopped unexpectedly. Please retry.")
+            if kind == "analyse":
+                metrics.registry.observe("failed")
+            with self._lock:
+                self._discard_pool(pool)
+        except Exception as e:
+            print(f"Analysis job {job_id} failed: {e}")
+            self.store.fail(job_id, f"An error occurred during analysis: {str(e)}")
+            if kind == "analyse":
+                metrics.registry.observe("failed")
+        finally:
+            with self._lock:
+                self._pending -= 1
+            for path in cleanup_paths:
+                if path and os.path.exists(path):
+                    os.unlink(path)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    @property
+    def pending(self) -> int:
+        """Jobs of this process that are queued or running."""
+        with self._lock:
+            return self._pending
@@ -0,0 +1,154 @@
+# backend/metrics.py
+"""
+Timing and counters for analyses.
+
+A RunMetrics collects per-stage wall time, event counters (API calls,
+cache hits, bytes fetched, ...) and peak gauges (memory growth) for one
+analyse() call. Code deep in the pipeline reports through incr() and peak(),
+which find the active run via a context
+variable; work handed to thread pools keeps it by wrapping the callable
+with bind(). Finished runs are folded into the process-wide `registry`,
+which GET /metrics renders in the Prometheus text format.
+"""
+
+import contextvars
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+_current: contextvars.ContextVar = contextvars.ContextVar("analysis_metrics", default=None)
+
+
+class RunMetrics:
+    def __init__(self):
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.gauges: Dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] += time.perf_counter() - t0
+
+    def incr(self, name: str, n: float = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def peak(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = max(value, self.gauges.get(name, value))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"total_seconds": round(time.perf_counter() - self._started, 4),
+                    "stages": {k: round(v, 4) for k, v in self.stages.items()},
+                    "counters": dict(self.counters), "gauges": dict(self.gauges)}
+
+
+def current() -> Optional[RunMetrics]:
+    return _current.get()
+
+
+def incr(name: str, n: float = 1):
+    """Adds to a counter of the active run, if there is one."""
+    run = _current.get()
+    if run is not None:
+        run.incr(name, n)
+
+
+def peak(name: str, value: float):
+    """Raises a gauge of the active run to value, if there is one."""
+    run = _current.get()
+    if run is not None:
+        run.peak(name, value)
+
+
+@contextmanager
+def collecting(run: RunMetrics) -> Iterator[RunMetrics]:
+    token = _current.set(run)
+    try:
+        yield run
+    finally:
+        _current.reset(token)
+
+
+def bind(fn: Callable) -> Callable:
+    """Wraps fn so that it reports to the current run from any thread."""
+    run = _current.get()
+
+    def wrapper(*args, **kwargs):
+        token = _current.set(run)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return wrapper
+
+
+def _name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name).lower()
+
+
+class Registry:
+    """Process-wide totals over finished analyses."""
+
+    def __init__(self):
+        self.analyses: Dict[str, int] = defaultdict(int)
+        self.stage_sum: Dict[str, float] = defaultdict(float)
+        self.stage_count: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.gauge_max: Dict[str, float] = {}
+        self.gauge_last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, status: str, snapshot: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.analyses[status] += 1
+            if not snapshot:
+                return
+            self.stage_sum["total"] += snapshot["total_seconds"]
+            self.stage_count["total"] += 1
+            for stage, seconds in snapshot["stages"].items():
+                self.stage_sum[stage] += seconds
+                self.stage_count[stage] += 1
+            for name, value in snapshot["counters"].items():
+                self.counters[name] += value
+            for name, value in snapshot.get("gauges", {}).items():
+                self.gauge_max[name] = max(value, self.gauge_max.get(name, value))
+                self.gauge_last[name] = value
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        lines = []
+        with self._lock:
+            lines += ["# HELP plagiarism_analyses_total Finished analyses by outcome.",
+                      "# TYPE plagiarism_analyses_total counter"]
+            lines += [f'plagiarism_analyses_total{{status="{s}"}} {n}' for s, n in sorted(self.analyses.items())]
+            lines += ["# HELP plagiarism_stage_seconds Wall time spent in each analysis stage.",
+                      "# TYPE plagiarism_stage_seconds summary"]
+            for stage in sorted(self.stage_sum):
+                lines.append(f'plagiarism_stage_seconds_sum{{stage="{stage}"}} {self.stage_sum[stage]:.4f}')
+                lines.append(f'plagiarism_stage_seconds_count{{stage="{stage}"}} {self.stage_count[stage]}')
+            for name, value in sorted(self.counters.items()):
+                metric = f"plagiarism_{_name(name)}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+            # Per-run gauges: the highest value seen and the latest run's.
+            for name in sorted(self.gauge_max):
+                metric = f"plagiarism_{_name(name)}"
+                lines += [f"# TYPE {metric}_max gauge", f"{metric}_max {self.gauge_max[name]:g}",
+                          f"# TYPE {metric}_last gauge", f"{metric}_last {self.gauge_last[name]:g}"]
+        for name, value in sorted((gauges or {}).items()):
+            metric = f"plagiarism_{_name(name)}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
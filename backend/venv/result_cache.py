@@ -0,0 +1,130 @@
+# backend/result_cache.py
+"""
+Result cache for whole analyses.
+
+Entries are keyed by a hash of the normalised document text plus the tuning
+knobs that affect the outcome, and expire after a TTL. When identical
+requests arrive together, the first one claims the key and the rest wait for
+its result instead of running the pipeline again. Everything lives in SQLite
+so hits, waits and in-flight claims are shared by all worker processes.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+CACHE_VERSION = 1  # bump when the pipeline changes in a way the knobs don't capture
+
+
+def normalize_text(txt: str) -> str:
+    """Folds differences that don't change the analysis: unicode form, line
+    endings and runs of spaces or tabs."""
+    txt = unicodedata.normalize("NFC", txt).replace("\r\n", "\n").replace("\r", "\n")
+    lines = (re.sub(r"[ \t]+", " ", line).strip() for line in txt.split("\n"))
+    return "\n".join(lines).strip()
+
+
+def result_key(txt: str, knobs: Dict[str, Any]) -> str:
+    payload = json.dumps({"v": CACHE_VERSION, "knobs": knobs, "text": normalize_text(txt)},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path: str, ttl: float, wait_timeout: float = 900, poll: float = 0.5):
+        self.path = path
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.poll = poll
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                         " key TEXT PRIMARY KEY, value TEXT NOT NULL, pdf BLOB, created_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS inflight ("
+                         " key TEXT PRIMARY KEY, started_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters ("
+                         " name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        # Closed explicitly: sqlite3 connections otherwise stay open until a GC pass.
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, name: str):
+        with self._conn() as conn:
+            conn.execute("INSERT INTO counters (name, value) VALUES (?, 1)"
+                         " ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], Optional[bytes]]]:
+        with self._conn() as conn:
+            row = conn.execute("SELECT value, pdf FROM results WHERE key = ? AND created_at > ?",
+                               (key, time.time() - self.ttl)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key: str, value: Dict[str, Any], pdf: Optional[bytes]):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO results (key, value, pdf, created_at) VALUES (?, ?, ?, ?)",
+                         (key, json.dumps(value), pdf, now))
+            conn.execute("DELETE FROM results WHERE created_at <= ?", (now - self.ttl,))
+
+    def _claim(self, key: str) -> bool:
+        now = time.time()
+        with self._conn() as conn:
+            # Take over claims whose owner has been silent for too long (crashed worker).
+            conn.execute("DELETE FROM inflight WHERE key = ? AND started_at < ?", (key, now - self.wait_timeout))
+            try:
+                conn.execute("INSERT INTO inflight (key, started_at) VALUES (?, ?)", (key, now))
+                return True
+            except sqlite3.IntegrityError:
+                return False
+
+    def _release(self, key: str):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM inflight WHERE key = ?", (key,))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[Dict[str, Any], Optional[bytes]]]) \
+            -> Tuple[Dict[str, Any], Optional[bytes]]:
+        """Returns the cached (value, pdf) for key, computing it at most once
+        across concurrent callers. Values with a true "partial" entry (an
+        upstream API failed) are returned but not stored."""
+        waited = False
+        while True:
+            cached = self.get(key)
+            if cached:
+                self._count("coalesced" if waited else "hits")
+                return cached
+            if self._claim(key):
+                self._count("misses")
+                try:
+                    value, pdf = compute()
+                    if not value.get("partial"):
+                        self.put(key, value, pdf)
+                    return value, pdf
+                finally:
+                    self._release(key)
+            # Someone else is computing this key; if they fail, their claim
+            # disappears and the next loop takes it over.
+            waited = True
+            time.sleep(self.poll)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._conn() as conn:
+            out = {name: 0 for name in ("hits", "misses", "coalesced")}
+            out.update(conn.execute("SELECT name, value FROM counters").fetchall())
+            out["entries"] = conn.execute("SELECT COUNT(*) FROM results WHERE created_at > ?",
+                                          (time.time() - self.ttl,)).fetchone()[0]
+            out["in_flight"] = conn.execute("SELECT COUNT(*) FROM inflight").fetchone()[0]
+        total = out["hits"] + out["coalesced"] + out["misses"]
+        out["hit_ratio"] = round((out["hits"] + out["coalesced"]) / total, 3) if total else 0.0
+        return out
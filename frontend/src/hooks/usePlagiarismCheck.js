@@ -2,6 +2,7 @@
 import { useState, useCallback, useRef } from 'react';
 
 const API_BASE_URL = 'http://127.0.0.1:5000';// Your Flask backend URL
+const POLL_INTERVAL_MS = 2000; // How often to ask the backend for job progress
 
 export const usePlagiarismCheck = () => {
   const [loading, setLoading] = useState(false);
@@ -36,25 +37,24 @@ export const usePlagiarismCheck = () => {
       formData.append('comparison_file', comparisonFile);
     }
 
-    // Simulate progress messages (backend is synchronous)
-    const messages = [
-      "Analyzing document structure...",
-      "Generating search queries...",
-      "Searching the web for similar content...",
-      "Fetching external sources...",
-      "Comparing content for overlaps...",
-      "Detecting AI-generated patterns...",
-      "Compiling detailed report..." // Removed visualization steps
-    ];
-    let msgIndex = 0;
-    const interval = setInterval(() => {
-      if (msgIndex < messages.length) {
-        setLoadingMessage(messages[msgIndex]);
-        msgIndex++;
-      } else {
-        setLoadingMessage("Finalizing report..."); // Loop or hold last message
+    // The backend queues the analysis and reports its current stage
+    const stageMessages = {
+      extract: "Analyzing document structure...",
+      search: "Searching the web for similar content...",
+      plagiarism: "Comparing content for overlaps...",
+      ai: "Detecting AI-generated patterns...",
+      report: "Compiling detailed report...",
+    };
+
+    const readError = async (response) => {
+      // If not authenticated, Flask will redirect to login page.
+      // Frontend should handle 401 specifically if needed.
+      if (response.status === 401) {
+        return new Error("Authentication required. Please log in.");
       }
-    }, 2000); // Update message every 2 seconds
+      const errorData = await response.json();
+      return new Error(errorData.error || `HTTP error! status: ${response.status}`);
+    };
 
     try {
       const response = await fetch(`${API_BASE_URL}/analyse`, {
@@ -63,23 +63,50 @@ export const usePlagiarismCheck = () => {
         signal: signal, // Pass the signal to the fetch request
         credentials: 'include', // Important for sending session cookies
       });
+      if (!response.ok) {
+        throw await readError(response);
+      }
 
-      clearInterval(interval); // Stop the interval once response is received
+      const { jobId } = await response.json();
+      setLoadingMessage("Waiting for an available analyser...");
+
+      // Poll the job until it finishes; aborting the signal stops both the
+      // pending request and the wait between polls.
+      while (true) {
+        await new Promise((resolve, reject) => {
+          const onAbort = () => {
+            clearTimeout(timer);
+            reject(new DOMException('Aborted', 'AbortError'));
+          };
+          const timer = setTimeout(() => {
+            signal.removeEventListener('abort', onAbort);
+            resolve();
+          }, POLL_INTERVAL_MS);
+          signal.addEventListener('abort', onAbort, { once: true });
+        });
+
+        const jobResponse = await fetch(`${API_BASE_URL}/jobs/${jobId}`, {
+          method: 'GET',
+          signal: signal,
+          credentials: 'include',
+        });
+        if (!jobResponse.ok) {
+          throw await readError(jobResponse);
+        }
 
-      if (!response.ok) {
-        // If not authenticated, Flask will redirect to login page.
-        // Frontend should handle 401 specifically if needed.
-        if (response.status === 401) {
-          throw new Error("Authentication required. Please log in.");
+        const job = await jobResponse.json();
+        if (job.status === 'done') {
+          setResults(job.result);
+          break;
+        }
+        if (job.status === 'failed') {
+          throw new Error(job.error || "Analysis failed.");
+        }
+        if (job.stage) {
+          setLoadingMessage(stageMessages[job.stage] || "Finalizing report...");
         }
-        const errorData = await response.json();
-        throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
       }
-
-      const data = await response.json();
-      setResults(data);
     } catch (err) {
-      clearInterval(interval); // Ensure interval is cleared on error
       if (err.name === 'AbortError') {
         setError("Analysis cancelled by user.");
         setLoadingMessage("Analysis cancelled.");
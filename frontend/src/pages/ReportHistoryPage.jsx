@@ -12,6 +12,8 @@ function ReportHistoryPage() {
   const [reports, setReports] = useState([]);
   const [loadingHistory, setLoadingHistory] = useState(true);
   const [errorHistory, setErrorHistory] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null); // Cursor for the next page of reports
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchHistory = async () => {
@@ -29,7 +31,8 @@ function ReportHistoryPage() {
           throw new Error(`HTTP error! Status: ${response.status}`);
         }
         const data = await response.json();
-        setReports(data);
+        setReports(data.reports);
+        setNextCursor(data.next_cursor);
       } catch (err) {
         console.error("Failed to fetch reports history:", err);
         setErrorHistory("Failed to load reports history. Please try again.");
@@ -41,6 +44,27 @@ function ReportHistoryPage() {
     fetchHistory();
   }, [isAuthenticated]);
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    setErrorHistory(null);
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/history?cursor=${encodeURIComponent(nextCursor)}`, {
+        credentials: 'include',
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP error! Status: ${response.status}`);
+      }
+      const data = await response.json();
+      setReports((previous) => [...previous, ...data.reports]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      console.error("Failed to fetch more reports:", err);
+      setErrorHistory("Failed to load more reports. Please try again.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDownloadPdf = async (pdfFileName) => {
     if (!pdfFileName) {
       alert("No PDF report available for download.");
@@ -124,6 +148,11 @@ function ReportHistoryPage() {
               </div>
             </div>
           ))}
+          {nextCursor && (
+            <button onClick={handleLoadMore} className="btn btn-primary" disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          )}
         </div>
       )}
     </>